@@ -1,14 +1,29 @@
 import asyncio
+import atexit
+import copy
+import io
 import json
 import os
 import random
+import re
+import sys
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import accumulate
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
 import discord
 from discord import app_commands
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
 TOKEN = os.getenv("DISCORD_TOKEN")
 
 if not TOKEN:
@@ -29,7 +44,7 @@ LOSE_EMOJI = "<:pepecrya:1453395928219386048>"
 # ==============================
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Animal:
     animal_id: str
     emoji: str
@@ -39,10 +54,15 @@ class Animal:
     hp: int
     atk: int
     defense: int
-    aliases: List[str]
+    aliases: Tuple[str, ...]
+    # Stats never change, so the battle power is computed once per species.
+    _power: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_power", self.hp * 1.0 + self.atk * 1.5 + self.defense * 1.2)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Food:
     food_id: str
     emoji: str
@@ -52,11 +72,24 @@ class Food:
     atk_bonus: int
     def_bonus: int
     ability: str
-    aliases: List[str]
+    aliases: Tuple[str, ...]
+    _power: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_power", self.hp_bonus * 1.0 + self.atk_bonus * 1.5 + self.def_bonus * 1.2)
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE_PATH = os.path.join(BASE_DIR, "users.json")
+# Writes requested within this window are coalesced into a single flush.
+FLUSH_DELAY_SECONDS = 0.5
+# Flushes append to users.log; users.json itself is rewritten (and the log
+# emptied) at most this often, on -data and on shutdown.
+COMPACT_INTERVAL_SECONDS = 300
+
+# Dedicated generator for drop and enemy-team rolls, called directly instead
+# of through the random module's shared instance.
+_rng = random.Random()
 
 
 RARITY_ORDER = [
@@ -70,6 +103,7 @@ RARITY_ORDER = [
 ]
 
 RARITY_INDEX = {name: idx for idx, (name, _symbol) in enumerate(RARITY_ORDER)}
+_RARITY_SYMBOL: Dict[str, str] = dict(RARITY_ORDER)
 
 ROLE_EMOJI = {
     "TANK": "🛡️",
@@ -77,6 +111,15 @@ ROLE_EMOJI = {
     "SUPPORT": "🧪",
 }
 
+# Team slot keys, in battle order.
+SLOTS: Tuple[str, ...] = ("slot1", "slot2", "slot3")
+# (slot number, slot key, label) as shown by /team view.
+_TEAM_SLOTS: Tuple[Tuple[int, str, str], ...] = (
+    (1, "slot1", "🛡️ Tank"),
+    (2, "slot2", "⚔️ Attack"),
+    (3, "slot3", "🧪 Support"),
+)
+
 
 # Mutation tiers attached to owned animal instances.
 # Schema (per animal_id):
@@ -87,7 +130,7 @@ ROLE_EMOJI = {
 #   "emerald": 0,
 #   "rainbow": 0,
 # }
-MUTATION_ORDER = ["none", "golden", "diamond", "emerald", "rainbow"]
+MUTATION_ORDER = tuple(sys.intern(m) for m in ("none", "golden", "diamond", "emerald", "rainbow"))
 MUTATIONS = MUTATION_ORDER
 MUTATION_ALIASES = {
     "none": {"none", "normal", "base", "n"},
@@ -96,6 +139,10 @@ MUTATION_ALIASES = {
     "emerald": {"emerald", "emer", "em", "e"},
     "rainbow": {"rainbow", "rb", "rain", "r"},
 }
+MUTATION_ALIAS_TO_CANONICAL: Dict[str, str] = {
+    alias: canonical for canonical, aliases in MUTATION_ALIASES.items() for alias in aliases
+}
+MUTATION_ALIAS_TO_CANONICAL.update({mutation: mutation for mutation in MUTATION_ORDER})
 MUTATION_META = {
     "none": {"emoji": "", "multiplier": 1.0, "ability_multiplier": 1.0},
     "golden": {
@@ -121,43 +168,45 @@ MUTATION_META = {
 }
 
 
+# Called for every slot and bucket key on hot paths, almost always with one of
+# a handful of spellings; failures raise and so are never cached.
+@lru_cache(maxsize=64)
 def normalize_mutation_key(value: str) -> str:
-    key = (value or "").strip().lower()
-    for canonical, aliases in MUTATION_ALIASES.items():
-        if key == canonical or key in aliases:
-            return canonical
-    if key in MUTATIONS:
-        return key
-    raise ValueError(f"Unknown mutation key: {value}")
+    canonical = MUTATION_ALIAS_TO_CANONICAL.get((value or "").strip().lower())
+    if canonical is None:
+        raise ValueError(f"Unknown mutation key: {value}")
+    return canonical
 
 
 def _format_multiplier(multiplier: float) -> str:
     return f"{multiplier:g}"
 
 
-def mutation_badge(mutation_key: str) -> str:
-    mutation_key = normalize_mutation_key(mutation_key)
-    if mutation_key == "none":
-        return ""
-    meta = MUTATION_META[mutation_key]
-    multiplier_text = _format_multiplier(meta["multiplier"])
-    return f"{meta['emoji']} (x{multiplier_text})"
+# There are only five mutations, so their badge and label strings are
+# rendered once here instead of on every zoo line.
+MUTATION_EMOJI: Dict[str, str] = {mutation: meta["emoji"] for mutation, meta in MUTATION_META.items()}
+MUTATION_BADGE: Dict[str, str] = {
+    mutation: "" if mutation == "none" else f"{meta['emoji']} (x{_format_multiplier(meta['multiplier'])})"
+    for mutation, meta in MUTATION_META.items()
+}
+MUTATION_LABEL: Dict[str, str] = {
+    mutation: f"{mutation.capitalize()} {meta['emoji']}".strip() for mutation, meta in MUTATION_META.items()
+}
 
 
-def surround_mutated_emoji(animal_emoji: str, mutation_key: str) -> str:
-    # Keep the base emoji unchanged for all mutations to avoid ambiguous visuals.
-    return animal_emoji
+def mutation_badge(mutation_key: str) -> str:
+    return MUTATION_BADGE[normalize_mutation_key(mutation_key)]
 
 
 def format_variant(animal_emoji: str, animal_name: str, mutation_key: str) -> str:
-    base = f"{surround_mutated_emoji(animal_emoji, mutation_key)} {animal_name}"
+    # The base emoji stays unchanged for all mutations to avoid ambiguous visuals.
+    base = f"{animal_emoji} {animal_name}"
     badge = mutation_badge(mutation_key)
     return base if not badge else f"{base} {badge}"
 
 
 def format_variant_count(animal_emoji: str, mutation_key: str, count: int) -> str:
-    mutation_key = normalize_mutation_key(mutation_key)
-    base = f"{surround_mutated_emoji(animal_emoji, mutation_key)} x{count}"
+    base = f"{animal_emoji} x{count}"
     badge = mutation_badge(mutation_key)
     return base if not badge else f"{base} {badge}"
 
@@ -179,7 +228,7 @@ def format_owned_summary(animal_name_plural: str, animal_emoji: str, per_mutatio
     return f"You own {total_owned} {animal_name_plural}: {joined_counts}"
 
 
-def pluralize(animal_id: str) -> str:
+def _compute_plural(animal_id: str) -> str:
     if animal_id.endswith("fish"):
         return animal_id
     if animal_id.endswith("fox"):
@@ -189,41 +238,43 @@ def pluralize(animal_id: str) -> str:
     return f"{animal_id}s"
 
 
+_DEFAULT_MUTATION_TEMPLATE: Dict[str, int] = dict.fromkeys(MUTATION_ORDER, 0)
+
+
 def default_mutation_counts() -> Dict[str, int]:
-    return {mutation: 0 for mutation in MUTATIONS}
+    return _DEFAULT_MUTATION_TEMPLATE.copy()
+
+
+_EMPTY_BUCKET: Mapping[str, int] = MappingProxyType(default_mutation_counts())
+
+
+# Hunt mutation chances in percent, rarest first; anything past the last
+# threshold rolls "none".
+MUTATION_ROLL_CHANCES: Tuple[Tuple[str, float], ...] = (
+    ("rainbow", 1.0),
+    ("emerald", 2.5),
+    ("diamond", 5.0),
+    ("golden", 10.0),
+)
+_MUTATION_ROLL_THRESHOLDS = tuple(accumulate(chance for _mutation, chance in MUTATION_ROLL_CHANCES))
+_MUTATION_ROLL_VALUES = tuple(mutation for mutation, _chance in MUTATION_ROLL_CHANCES) + ("none",)
 
 
 def roll_mutation() -> str:
-    roll = random.random() * 100
-    if roll < 1.0:
-        return "rainbow"
-    if roll < 1.0 + 2.5:
-        return "emerald"
-    if roll < 1.0 + 2.5 + 5.0:
-        return "diamond"
-    if roll < 1.0 + 2.5 + 5.0 + 10.0:
-        return "golden"
-    return "none"
+    return _MUTATION_ROLL_VALUES[bisect_right(_MUTATION_ROLL_THRESHOLDS, random.random() * 100)]
 
 
 def format_mutation_label(mutation: str) -> str:
-    mutation_key = normalize_mutation_key(mutation)
-    emoji = MUTATION_META[mutation_key]["emoji"]
-    return f"{mutation_key.capitalize()} {emoji}".strip()
+    return MUTATION_LABEL[normalize_mutation_key(mutation)]
 
 
 def get_owned_count(profile: Dict, animal_id: str, mutation: str) -> int:
-    mutation = normalize_mutation_key(mutation)
-    zoo_entry = profile.get("zoo", {}).get(animal_id, {})
-    if isinstance(zoo_entry, dict):
-        return max(0, int(zoo_entry.get(mutation, 0)))
-    return max(0, int(zoo_entry if zoo_entry else 0)) if mutation == "none" else 0
+    return profile["zoo"].get(animal_id, _EMPTY_BUCKET)[normalize_mutation_key(mutation)]
 
 
-def mutation_bucket(profile: Dict, animal_id: str) -> Dict[str, int]:
-    zoo_entry = profile.get("zoo", {}).get(animal_id, default_mutation_counts())
+def _normalize_bucket(zoo_entry) -> Dict[str, int]:
+    bucket = default_mutation_counts()
     if isinstance(zoo_entry, dict):
-        bucket = default_mutation_counts()
         for key, qty in zoo_entry.items():
             try:
                 normalized = normalize_mutation_key(key)
@@ -233,30 +284,47 @@ def mutation_bucket(profile: Dict, animal_id: str) -> Dict[str, int]:
             bucket[normalized] = max(0, qty_int)
         return bucket
     try:
-        bucket = default_mutation_counts()
         bucket["none"] = max(0, int(zoo_entry))
-        return bucket
     except (ValueError, TypeError):
-        return default_mutation_counts()
+        pass
+    return bucket
+
+
+# Keys starting with "_" hold per-process caches on a profile and are never
+# written to users.json.
+def _bump_zoo_revision(profile: Dict) -> None:
+    profile["_rev"] = profile.get("_rev", 0) + 1
+
+
+# Profiles are migrated on load, so every zoo entry is a full bucket holding a
+# non-negative count for each mutation; the helpers below rely on that.
+def mutation_bucket(profile: Dict, animal_id: str) -> Mapping[str, int]:
+    return profile["zoo"].get(animal_id, _EMPTY_BUCKET)
 
 
 def total_owned_species(profile: Dict, animal_id: str) -> int:
-    bucket = mutation_bucket(profile, animal_id)
-    return sum(max(0, int(qty)) for qty in bucket.values())
+    return sum(mutation_bucket(profile, animal_id).values())
 
 
-def aggregate_mutation_totals(profile: Dict) -> Dict[str, int]:
+def _sum_buckets(zoo: Dict[str, Dict[str, int]]) -> Dict[str, int]:
     totals = default_mutation_counts()
-    for animal_id in profile.get("zoo", {}):
-        bucket = mutation_bucket(profile, animal_id)
+    for bucket in zoo.values():
         for mutation, qty in bucket.items():
-            totals[mutation] = totals.get(mutation, 0) + max(0, int(qty))
+            totals[mutation] += qty
+    return totals
+
+
+# Running per-mutation totals over the whole zoo, kept in step by add_animal
+# and remove_animal.
+def _zoo_totals(profile: Dict) -> Dict[str, int]:
+    totals = profile.get("_totals")
+    if totals is None:
+        totals = profile["_totals"] = _sum_buckets(profile["zoo"])
     return totals
 
 
 def total_animals_owned(profile: Dict) -> int:
-    totals = aggregate_mutation_totals(profile)
-    return sum(totals.values())
+    return sum(_zoo_totals(profile).values())
 
 
 def add_animal(profile: Dict, animal_id: str, mutation: str, qty: int) -> None:
@@ -264,19 +332,14 @@ def add_animal(profile: Dict, animal_id: str, mutation: str, qty: int) -> None:
     qty = max(0, int(qty))
     if qty <= 0:
         return
-    zoo = profile.setdefault("zoo", {})
-    current = zoo.get(animal_id, {})
-    if not isinstance(current, dict):
-        current = {"none": max(0, int(current))}
-    bucket = default_mutation_counts()
-    for key, value in current.items():
-        try:
-            normalized_key = normalize_mutation_key(key)
-        except ValueError:
-            continue
-        bucket[normalized_key] = max(0, int(value))
-    bucket[mutation] = bucket.get(mutation, 0) + qty
-    zoo[animal_id] = bucket
+    totals = _zoo_totals(profile)
+    zoo = profile["zoo"]
+    bucket = zoo.get(animal_id)
+    if bucket is None:
+        bucket = zoo[animal_id] = default_mutation_counts()
+    bucket[mutation] += qty
+    totals[mutation] += qty
+    _bump_zoo_revision(profile)
 
 
 def remove_animal(profile: Dict, animal_id: str, mutation: str, qty: int) -> int:
@@ -284,190 +347,149 @@ def remove_animal(profile: Dict, animal_id: str, mutation: str, qty: int) -> int
     qty = max(0, int(qty))
     if qty <= 0:
         return 0
-    zoo = profile.setdefault("zoo", {})
-    current = zoo.get(animal_id, {})
-    if not isinstance(current, dict):
-        current = {"none": max(0, int(current))}
-    bucket = default_mutation_counts()
-    for key, value in current.items():
-        try:
-            normalized_key = normalize_mutation_key(key)
-        except ValueError:
-            continue
-        bucket[normalized_key] = max(0, int(value))
-    owned = bucket.get(mutation, 0)
-    removed = min(owned, qty)
-    bucket[mutation] = max(0, owned - removed)
-    zoo[animal_id] = bucket
+    bucket = profile["zoo"].get(animal_id)
+    if bucket is None:
+        return 0
+    removed = min(bucket[mutation], qty)
+    bucket[mutation] -= removed
+    _zoo_totals(profile)[mutation] -= removed
+    # A removal can strand a team slot on a variant the user no longer owns;
+    # have the next load_profile re-validate the team.
+    profile.pop("_schema_ok", None)
+    _bump_zoo_revision(profile)
     return removed
 
 
-def build_animals() -> Dict[str, Animal]:
-    animals: List[Animal] = []
-
-    def add(
-        rarity: str,
-        rarity_index: int,
-        role: str,
-        animal_id: str,
-        emoji: str,
-        hp: int,
-        atk: int,
-        defense: int,
-        aliases: List[str],
-    ):
-        animals.append(
-            Animal(
-                animal_id=animal_id,
-                emoji=emoji,
-                rarity=rarity,
-                rarity_index=rarity_index,
-                role=role,
-                hp=hp,
-                atk=atk,
-                defense=defense,
-                aliases=aliases,
-            )
-        )
-
-    rarity_map = {name: idx for idx, (name, _) in enumerate(RARITY_ORDER)}
-
+# (rarity, role, animal_id, emoji, hp, atk, defense, aliases)
+_ANIMAL_ROWS: Tuple[Tuple[str, str, str, str, int, int, int, Tuple[str, ...]], ...] = (
     # COMMON
-    add("COMMON", rarity_map["COMMON"], "ATTACK", "mouse", "🐁", 7, 6, 1, ["mouse", "m"])
-    add("COMMON", rarity_map["COMMON"], "ATTACK", "chicken", "🐔", 7, 5, 1, ["chicken", "chick"])
-    add("COMMON", rarity_map["COMMON"], "ATTACK", "fish", "🐟", 7, 5, 1, ["fish"])
-    add("COMMON", rarity_map["COMMON"], "TANK", "pig", "🐖", 10, 3, 3, ["pig"])
-    add("COMMON", rarity_map["COMMON"], "TANK", "cow", "🐄", 11, 3, 3, ["cow"])
-    add("COMMON", rarity_map["COMMON"], "TANK", "ram", "🐏", 9, 4, 3, ["ram"])
-    add("COMMON", rarity_map["COMMON"], "TANK", "sheep", "🐑", 9, 3, 4, ["sheep"])
-    add("COMMON", rarity_map["COMMON"], "TANK", "goat", "🐐", 8, 4, 3, ["goat"])
-    add("COMMON", rarity_map["COMMON"], "SUPPORT", "bug", "🐛", 7, 3, 3, ["bug"])
-    add("COMMON", rarity_map["COMMON"], "SUPPORT", "ant", "🐜", 6, 3, 3, ["ant"])
-    add("COMMON", rarity_map["COMMON"], "SUPPORT", "bird", "🐦", 7, 3, 3, ["bird"])
+    ("COMMON", "ATTACK", "mouse", "🐁", 7, 6, 1, ("mouse", "m")),
+    ("COMMON", "ATTACK", "chicken", "🐔", 7, 5, 1, ("chicken", "chick")),
+    ("COMMON", "ATTACK", "fish", "🐟", 7, 5, 1, ("fish",)),
+    ("COMMON", "TANK", "pig", "🐖", 10, 3, 3, ("pig",)),
+    ("COMMON", "TANK", "cow", "🐄", 11, 3, 3, ("cow",)),
+    ("COMMON", "TANK", "ram", "🐏", 9, 4, 3, ("ram",)),
+    ("COMMON", "TANK", "sheep", "🐑", 9, 3, 4, ("sheep",)),
+    ("COMMON", "TANK", "goat", "🐐", 8, 4, 3, ("goat",)),
+    ("COMMON", "SUPPORT", "bug", "🐛", 7, 3, 3, ("bug",)),
+    ("COMMON", "SUPPORT", "ant", "🐜", 6, 3, 3, ("ant",)),
+    ("COMMON", "SUPPORT", "bird", "🐦", 7, 3, 3, ("bird",)),
 
     # UNCOMMON
-    add("UNCOMMON", rarity_map["UNCOMMON"], "ATTACK", "dog", "🐕", 8, 7, 2, ["dog"])
-    add("UNCOMMON", rarity_map["UNCOMMON"], "ATTACK", "cat", "🐈", 8, 7, 2, ["cat"])
-    add("UNCOMMON", rarity_map["UNCOMMON"], "ATTACK", "snake", "🐍", 8, 8, 2, ["snake"])
-    add("UNCOMMON", rarity_map["UNCOMMON"], "TANK", "horse", "🐎", 13, 4, 4, ["horse"])
-    add("UNCOMMON", rarity_map["UNCOMMON"], "TANK", "boar", "🐗", 12, 5, 4, ["boar"])
-    add("UNCOMMON", rarity_map["UNCOMMON"], "TANK", "deer", "🦌", 12, 4, 5, ["deer"])
-    add("UNCOMMON", rarity_map["UNCOMMON"], "TANK", "turtle", "🐢", 14, 2, 5, ["turtle"])
-    add("UNCOMMON", rarity_map["UNCOMMON"], "SUPPORT", "tropicalfish", "🐠", 8, 4, 4, ["tropicalfish", "tfish"])
+    ("UNCOMMON", "ATTACK", "dog", "🐕", 8, 7, 2, ("dog",)),
+    ("UNCOMMON", "ATTACK", "cat", "🐈", 8, 7, 2, ("cat",)),
+    ("UNCOMMON", "ATTACK", "snake", "🐍", 8, 8, 2, ("snake",)),
+    ("UNCOMMON", "TANK", "horse", "🐎", 13, 4, 4, ("horse",)),
+    ("UNCOMMON", "TANK", "boar", "🐗", 12, 5, 4, ("boar",)),
+    ("UNCOMMON", "TANK", "deer", "🦌", 12, 4, 5, ("deer",)),
+    ("UNCOMMON", "TANK", "turtle", "🐢", 14, 2, 5, ("turtle",)),
+    ("UNCOMMON", "SUPPORT", "tropicalfish", "🐠", 8, 4, 4, ("tropicalfish", "tfish")),
 
     # RARE
-    add("RARE", rarity_map["RARE"], "ATTACK", "wolf", "🐺", 9, 9, 3, ["wolf"])
-    add("RARE", rarity_map["RARE"], "ATTACK", "fox", "🦊", 9, 9, 3, ["fox"])
-    add("RARE", rarity_map["RARE"], "ATTACK", "dolphin", "🐬", 10, 8, 3, ["dolphin"])
-    add("RARE", rarity_map["RARE"], "TANK", "crocodile", "🐊", 15, 5, 6, ["crocodile", "croc"])
-    add("RARE", rarity_map["RARE"], "SUPPORT", "raccoon", "🦝", 9, 4, 5, ["raccoon"])
-    add("RARE", rarity_map["RARE"], "SUPPORT", "owl", "🦉", 9, 3, 6, ["owl"])
-    add("RARE", rarity_map["RARE"], "SUPPORT", "parrot", "🦜", 8, 4, 5, ["parrot"])
+    ("RARE", "ATTACK", "wolf", "🐺", 9, 9, 3, ("wolf",)),
+    ("RARE", "ATTACK", "fox", "🦊", 9, 9, 3, ("fox",)),
+    ("RARE", "ATTACK", "dolphin", "🐬", 10, 8, 3, ("dolphin",)),
+    ("RARE", "TANK", "crocodile", "🐊", 15, 5, 6, ("crocodile", "croc")),
+    ("RARE", "SUPPORT", "raccoon", "🦝", 9, 4, 5, ("raccoon",)),
+    ("RARE", "SUPPORT", "owl", "🦉", 9, 3, 6, ("owl",)),
+    ("RARE", "SUPPORT", "parrot", "🦜", 8, 4, 5, ("parrot",)),
 
     # EPIC
-    add("EPIC", rarity_map["EPIC"], "TANK", "elephant", "🐘", 18, 4, 8, ["elephant", "ele"])
-    add("EPIC", rarity_map["EPIC"], "TANK", "hippo", "🦛", 19, 4, 8, ["hippo"])
-    add("EPIC", rarity_map["EPIC"], "TANK", "llama", "🦙", 16, 5, 7, ["llama"])
-    add("EPIC", rarity_map["EPIC"], "TANK", "giraffe", "🦒", 17, 5, 7, ["giraffe"])
-    add("EPIC", rarity_map["EPIC"], "SUPPORT", "swan_epic", "🦢", 11, 4, 7, ["swan"])
-    add("EPIC", rarity_map["EPIC"], "SUPPORT", "flamingo", "🦩", 10, 5, 6, ["flamingo"])
+    ("EPIC", "TANK", "elephant", "🐘", 18, 4, 8, ("elephant", "ele")),
+    ("EPIC", "TANK", "hippo", "🦛", 19, 4, 8, ("hippo",)),
+    ("EPIC", "TANK", "llama", "🦙", 16, 5, 7, ("llama",)),
+    ("EPIC", "TANK", "giraffe", "🦒", 17, 5, 7, ("giraffe",)),
+    ("EPIC", "SUPPORT", "swan_epic", "🦢", 11, 4, 7, ("swan",)),
+    ("EPIC", "SUPPORT", "flamingo", "🦩", 10, 5, 6, ("flamingo",)),
 
     # LEGENDARY
-    add("LEGENDARY", rarity_map["LEGENDARY"], "ATTACK", "shark", "🦈", 14, 11, 4, ["shark"])
-    add("LEGENDARY", rarity_map["LEGENDARY"], "TANK", "mammoth", "🦣", 22, 5, 9, ["mammoth"])
-    add("LEGENDARY", rarity_map["LEGENDARY"], "TANK", "seal", "🦭", 20, 6, 8, ["seal"])
-    add("LEGENDARY", rarity_map["LEGENDARY"], "TANK", "whale", "🐳", 24, 4, 10, ["whale"])
+    ("LEGENDARY", "ATTACK", "shark", "🦈", 14, 11, 4, ("shark",)),
+    ("LEGENDARY", "TANK", "mammoth", "🦣", 22, 5, 9, ("mammoth",)),
+    ("LEGENDARY", "TANK", "seal", "🦭", 20, 6, 8, ("seal",)),
+    ("LEGENDARY", "TANK", "whale", "🐳", 24, 4, 10, ("whale",)),
 
     # SPECIAL
-    add("SPECIAL", rarity_map["SPECIAL"], "SUPPORT", "octopus", "🐙", 12, 5, 7, ["octopus"])
-    add("SPECIAL", rarity_map["SPECIAL"], "SUPPORT", "butterfly", "🦋", 10, 4, 6, ["butterfly"])
+    ("SPECIAL", "SUPPORT", "octopus", "🐙", 12, 5, 7, ("octopus",)),
+    ("SPECIAL", "SUPPORT", "butterfly", "🦋", 10, 4, 6, ("butterfly",)),
 
     # HIDDEN
-    add("HIDDEN", rarity_map["HIDDEN"], "ATTACK", "dragon", "🐉", 16, 13, 5, ["dragon"])
-    add("HIDDEN", rarity_map["HIDDEN"], "TANK", "trex", "🦖", 25, 7, 10, ["trex", "t-rex"])
-    add("HIDDEN", rarity_map["HIDDEN"], "SUPPORT", "unicorn", "🦄", 14, 6, 8, ["unicorn"])
-
-    return {a.animal_id: a for a in animals}
-
+    ("HIDDEN", "ATTACK", "dragon", "🐉", 16, 13, 5, ("dragon",)),
+    ("HIDDEN", "TANK", "trex", "🦖", 25, 7, 10, ("trex", "t-rex")),
+    ("HIDDEN", "SUPPORT", "unicorn", "🦄", 14, 6, 8, ("unicorn",)),
+)
 
-ANIMALS = build_animals()
+# Ids, emojis and aliases are interned so that the canonical strings handed out
+# by resolve_animal/resolve_food and the zoo keys loaded from users.json are
+# the same objects, letting dict lookups short-circuit on identity.
+ANIMALS: Dict[str, Animal] = {
+    sys.intern(animal_id): Animal(
+        animal_id=sys.intern(animal_id),
+        emoji=sys.intern(emoji),
+        rarity=rarity,
+        rarity_index=RARITY_INDEX[rarity],
+        role=role,
+        hp=hp,
+        atk=atk,
+        defense=defense,
+        aliases=aliases,
+    )
+    for rarity, role, animal_id, emoji, hp, atk, defense, aliases in _ANIMAL_ROWS
+}
+PLURALS: Dict[str, str] = {animal_id: _compute_plural(animal_id) for animal_id in ANIMALS}
+ANIMAL_DISPLAY_NAMES: Dict[str, str] = {
+    animal_id: plural.replace("_", " ") for animal_id, plural in PLURALS.items()
+}
 LORE = {a.animal_id: f"Stories say the {a.animal_id.replace('_', ' ')} thrives in distant lands." for a in ANIMALS.values()}
-ALIASES: Dict[str, str] = {}
-for animal in ANIMALS.values():
-    for alias in animal.aliases + [animal.emoji]:
-        ALIASES[alias] = animal.animal_id
-
-
-def build_foods() -> Dict[str, Food]:
-    foods: List[Food] = []
-
-    def add(
-        food_id: str,
-        emoji: str,
-        rarity: str,
-        cost: int,
-        hp_bonus: int,
-        atk_bonus: int,
-        def_bonus: int,
-        ability: str,
-        aliases: List[str],
-    ):
-        foods.append(
-            Food(
-                food_id=food_id,
-                emoji=emoji,
-                rarity=rarity,
-                cost=cost,
-                hp_bonus=hp_bonus,
-                atk_bonus=atk_bonus,
-                def_bonus=def_bonus,
-                ability=ability,
-                aliases=aliases,
-            )
-        )
-
-    add("apple", "🍎", "COMMON", 10, 2, 0, 0, "Sweet heal boosts HP slightly.", ["apple"])
-    add("carrot", "🥕", "COMMON", 10, 1, 1, 0, "Crunchy bite adds small ATK.", ["carrot"])
-    add("berry", "🫐", "COMMON", 12, 0, 1, 1, "Balanced snack for nimble critters.", ["berry"])
-    add("bread", "🍞", "COMMON", 15, 2, 0, 1, "Comfort food with light defense.", ["bread"])
-    add("corn", "🌽", "COMMON", 15, 1, 2, 0, "Energy burst improves strikes.", ["corn"])
+# Alias keys are already lowercase; resolve_animal/resolve_food lowercase the query.
+ALIAS_TO_ANIMAL: Dict[str, Animal] = {
+    sys.intern(alias): animal for animal in ANIMALS.values() for alias in (*animal.aliases, animal.emoji)
+}
 
-    add("honey", "🍯", "UNCOMMON", 30, 3, 1, 1, "Sticky glaze toughens hides.", ["honey"])
-    add("seaweed", "🪸", "UNCOMMON", 35, 2, 2, 1, "Ocean greens steady the mind.", ["seaweed", "kelp"])
-    add("mushroom", "🍄", "UNCOMMON", 35, 1, 2, 2, "Forest spores sharpen senses.", ["mushroom", "shroom"])
-    add("coconut", "🥥", "UNCOMMON", 40, 4, 0, 2, "Hard shell blocks blows.", ["coconut"])
 
-    add("sushi", "🍣", "RARE", 80, 3, 4, 2, "Fresh cuts fuel precision strikes.", ["sushi"])
-    add("cheese", "🧀", "RARE", 75, 5, 2, 1, "Rich flavor fortifies bodies.", ["cheese"])
-    add("pepper", "🌶️", "RARE", 85, 0, 6, 1, "Spicy heat ignites fury.", ["pepper", "chili"])
-    add("egg", "🥚", "RARE", 80, 4, 2, 2, "Protein pack grows resilient shells.", ["egg"])
+# (food_id, emoji, rarity, cost, hp_bonus, atk_bonus, def_bonus, ability, aliases)
+_FOOD_ROWS: Tuple[Tuple[str, str, str, int, int, int, int, str, Tuple[str, ...]], ...] = (
+    ("apple", "🍎", "COMMON", 10, 2, 0, 0, "Sweet heal boosts HP slightly.", ("apple",)),
+    ("carrot", "🥕", "COMMON", 10, 1, 1, 0, "Crunchy bite adds small ATK.", ("carrot",)),
+    ("berry", "🫐", "COMMON", 12, 0, 1, 1, "Balanced snack for nimble critters.", ("berry",)),
+    ("bread", "🍞", "COMMON", 15, 2, 0, 1, "Comfort food with light defense.", ("bread",)),
+    ("corn", "🌽", "COMMON", 15, 1, 2, 0, "Energy burst improves strikes.", ("corn",)),
 
-    add("steak", "🥩", "EPIC", 200, 6, 6, 2, "Prime cut empowers champions.", ["steak"])
-    add("ramen", "🍜", "EPIC", 210, 4, 5, 4, "Hearty bowl restores focus.", ["ramen", "noodles"])
-    add("salmon", "🍣", "EPIC", 220, 5, 5, 3, "Omega boost sharpens instincts.", ["salmon"])
-    add("truffle", "🍄", "EPIC", 230, 3, 6, 5, "Rare aroma inspires bravery.", ["truffle"])
+    ("honey", "🍯", "UNCOMMON", 30, 3, 1, 1, "Sticky glaze toughens hides.", ("honey",)),
+    ("seaweed", "🪸", "UNCOMMON", 35, 2, 2, 1, "Ocean greens steady the mind.", ("seaweed", "kelp")),
+    ("mushroom", "🍄", "UNCOMMON", 35, 1, 2, 2, "Forest spores sharpen senses.", ("mushroom", "shroom")),
+    ("coconut", "🥥", "UNCOMMON", 40, 4, 0, 2, "Hard shell blocks blows.", ("coconut",)),
 
-    add("golden_apple", "🍏", "LEGENDARY", 500, 10, 6, 6, "Mythic fruit renews life.", ["gapple", "goldapple"])
-    add("phoenix_pepper", "🪽", "LEGENDARY", 520, 4, 12, 4, "Flame-kissed spice scorches foes.", ["phoenixpepper", "firepepper"])
-    add("royal_honey", "🍯", "LEGENDARY", 510, 8, 5, 8, "Regal nectar hardens armor.", ["royalhoney"])
+    ("sushi", "🍣", "RARE", 80, 3, 4, 2, "Fresh cuts fuel precision strikes.", ("sushi",)),
+    ("cheese", "🧀", "RARE", 75, 5, 2, 1, "Rich flavor fortifies bodies.", ("cheese",)),
+    ("pepper", "🌶️", "RARE", 85, 0, 6, 1, "Spicy heat ignites fury.", ("pepper", "chili")),
+    ("egg", "🥚", "RARE", 80, 4, 2, 2, "Protein pack grows resilient shells.", ("egg",)),
 
-    add("stardust", "✨", "SPECIAL", 900, 12, 10, 10, "Falling star radiance empowers all stats.", ["stardust"])
-    add("moon_berry", "🌙", "SPECIAL", 880, 14, 8, 8, "Night bloom calms and heals.", ["moonberry"])
+    ("steak", "🥩", "EPIC", 200, 6, 6, 2, "Prime cut empowers champions.", ("steak",)),
+    ("ramen", "🍜", "EPIC", 210, 4, 5, 4, "Hearty bowl restores focus.", ("ramen", "noodles")),
+    ("salmon", "🍣", "EPIC", 220, 5, 5, 3, "Omega boost sharpens instincts.", ("salmon",)),
+    ("truffle", "🍄", "EPIC", 230, 3, 6, 5, "Rare aroma inspires bravery.", ("truffle",)),
 
-    add("dragons_feast", "🍖", "HIDDEN", 1500, 16, 16, 12, "Legendary banquet awakens ancient power.", ["dragonfeast", "dfeast"])
-    add("unicorn_cake", "🍰", "HIDDEN", 1550, 14, 12, 14, "Shimmering icing shields allies.", ["unicorncake", "ucake"])
-    add("abyssal_ink", "🪶", "HIDDEN", 1600, 12, 18, 10, "Void ink sharpens lethal focus.", ["ink", "abyssalink"])
+    ("golden_apple", "🍏", "LEGENDARY", 500, 10, 6, 6, "Mythic fruit renews life.", ("gapple", "goldapple")),
+    ("phoenix_pepper", "🪽", "LEGENDARY", 520, 4, 12, 4, "Flame-kissed spice scorches foes.", ("phoenixpepper", "firepepper")),
+    ("royal_honey", "🍯", "LEGENDARY", 510, 8, 5, 8, "Regal nectar hardens armor.", ("royalhoney",)),
 
-    add("ancient_seed", "🪴", "SPECIAL", 950, 18, 6, 12, "Grows protective vines mid-battle.", ["ancientseed", "seed"])
+    ("stardust", "✨", "SPECIAL", 900, 12, 10, 10, "Falling star radiance empowers all stats.", ("stardust",)),
+    ("moon_berry", "🌙", "SPECIAL", 880, 14, 8, 8, "Night bloom calms and heals.", ("moonberry",)),
 
-    return {f.food_id: f for f in foods}
+    ("dragons_feast", "🍖", "HIDDEN", 1500, 16, 16, 12, "Legendary banquet awakens ancient power.", ("dragonfeast", "dfeast")),
+    ("unicorn_cake", "🍰", "HIDDEN", 1550, 14, 12, 14, "Shimmering icing shields allies.", ("unicorncake", "ucake")),
+    ("abyssal_ink", "🪶", "HIDDEN", 1600, 12, 18, 10, "Void ink sharpens lethal focus.", ("ink", "abyssalink")),
 
+    ("ancient_seed", "🪴", "SPECIAL", 950, 18, 6, 12, "Grows protective vines mid-battle.", ("ancientseed", "seed")),
+)
 
-FOODS = build_foods()
-FOOD_ALIASES: Dict[str, str] = {}
-for food in FOODS.values():
-    for alias in food.aliases + [food.emoji]:
-        FOOD_ALIASES[alias] = food.food_id
+FOODS: Dict[str, Food] = {
+    sys.intern(food_id): Food(sys.intern(food_id), sys.intern(emoji), *rest)
+    for food_id, emoji, *rest in _FOOD_ROWS
+}
+ALIAS_TO_FOOD: Dict[str, Food] = {
+    sys.intern(alias): food for food in FOODS.values() for alias in (*food.aliases, food.emoji)
+}
 
 
 DROP_TABLE: List[Tuple[float, str]] = [
@@ -479,6 +501,13 @@ DROP_TABLE: List[Tuple[float, str]] = [
     (0.5, "SPECIAL"),
     (0.3, "HIDDEN"),
 ]
+# Upper bound of each rarity's roll window; the last rarity takes everything
+# above the second-to-last bound.
+_DROP_THRESHOLDS = tuple(accumulate(chance for chance, _rarity in DROP_TABLE))[:-1]
+_DROP_RARITIES = tuple(rarity for _chance, rarity in DROP_TABLE)
+_RARITY_DROP_RATE: Mapping[str, float] = MappingProxyType(
+    {rarity: chance for chance, rarity in DROP_TABLE}
+)
 
 RARITY_SELL_VALUE = {
     "COMMON": 1,
@@ -506,9 +535,99 @@ RARITY_COIN_WEIGHT = {
 # ==============================
 
 
+SCHEMA_VERSION = 3
+
+# Keys backfilled onto profiles saved by older versions, in file order.
+_PROFILE_DEFAULTS: Dict[str, object] = {
+    "coins": 0,
+    "energy": 0,
+    "zoo": {},
+    "team": {"slot1": None, "slot2": None, "slot3": None},
+    "foods": {},
+    "equipped_foods": {"slot1": None, "slot2": None, "slot3": None},
+    "equipped_food_wins": {"slot1": 0, "slot2": 0, "slot3": 0},
+    "cooldowns": {"hunt": 0.0, "battle": 0.0, "daily": 0.0},
+    "last_enemy_signature": None,
+    "battles_won": 0,
+}
+
+
+def compute_level(battles_won: int) -> int:
+    # Each level needs twice the wins of the previous one (level n + 1 starts
+    # at 2 ** (n - 1) wins), so the level is just the bit length plus one.
+    return max(0, int(battles_won)).bit_length() + 1
+
+
+def _dump_json(data: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def _dump_json_line(data: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _load_json(raw: bytes) -> Dict:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _persistable_profile(profile: Dict) -> Dict:
+    return {key: value for key, value in profile.items() if not key.startswith("_")}
+
+
+def _indent_json(payload: bytes, depth: int) -> bytes:
+    # Structural newlines are the only raw newlines in a JSON document, so
+    # this nests an indented dump one or more levels deeper.
+    return payload.replace(b"\n", b"\n" + b"  " * depth)
+
+
+def _assemble_document(data: Dict, user_blobs: Dict[str, bytes]) -> bytes:
+    """Lay out *data* exactly as _dump_json would, reusing pre-encoded users.
+
+    *user_blobs* maps each user id to its profile already dumped and indented
+    to sit inside the "users" object.
+    """
+    entries: List[bytes] = []
+    for key, value in data.items():
+        if key == "users":
+            users = [b"    " + _dump_json(user_id) + b": " + blob for user_id, blob in user_blobs.items()]
+            body = b"{\n" + b",\n".join(users) + b"\n  }" if users else b"{}"
+        else:
+            body = _indent_json(_dump_json(value), 1)
+        entries.append(b"  " + _dump_json(key) + b": " + body)
+    return b"{\n" + b",\n".join(entries) + b"\n}"
+
+
+# (hatch_counts, owned_counts, sold_counts) straight out of store.data["global"].
+GlobalStatsView = Tuple[Dict[str, int], Dict[str, int], Dict[str, int]]
+
+
 class DataStore:
     def __init__(self, path: str = DATA_FILE_PATH):
         self.path = path
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # users.json stays a single document, but each profile's encoding is
+        # cached and only redone for users handed out by load_profile or
+        # save_profile since the last write.
+        self._user_blobs: Dict[str, bytes] = {}
+        self._stale_users: set = set()
+        # Between compactions each flush appends one record to the journal with
+        # the full profile of every user touched since the previous flush, plus
+        # the global counters. Records are numbered; users.json remembers the
+        # last one it includes so replay never rolls a profile back.
+        self.journal_path = f"{os.path.splitext(path)[0]}.log"
+        self._journal_users: set = set()
+        self._journal_seq = 0
+        self._journal_pending = False
+        self._force_compaction = False
+        self._compacted_at = time.monotonic()
         self.data = self._load_data()
 
     def _load_data(self) -> Dict:
@@ -516,53 +635,71 @@ class DataStore:
         if dir_name:
             os.makedirs(dir_name, exist_ok=True)
         if not os.path.exists(self.path):
-            initial_content = {"version": 3, "users": {}, "global": {"hatch_counts": {}}}
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(initial_content, f, indent=2)
+            initial_content = {"version": SCHEMA_VERSION, "users": {}, "global": {"hatch_counts": {}}}
+            # Not _write_snapshot: users.log may still hold every profile if
+            # users.json was lost, and it has to survive until replay below.
+            self._write_bytes(_dump_json(initial_content))
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(self.path, "rb") as f:
+                data = _load_json(f.read())
         except json.JSONDecodeError as exc:
             print(f"❌ Failed to parse users.json: {exc}")
             raise RuntimeError("users.json is invalid. Fix the file before running the bot.")
 
         if "version" not in data or "users" not in data:
             raise RuntimeError("users.json is missing required keys. Aborting startup.")
-        if data.get("version", 0) < 3:
-            data["version"] = 3
+        if data.get("version", 0) < SCHEMA_VERSION:
+            data["version"] = SCHEMA_VERSION
             migrated_version = True
         else:
             migrated_version = False
+        replayed = self._replay_journal(data)
         data.setdefault("global", {"hatch_counts": {}})
         global_data = data.setdefault("global", {})
         global_data.setdefault("hatch_counts", {})
         global_data.setdefault("owned_counts", {})
         global_data.setdefault("sold_counts", {})
         users = data.get("users", {})
-        migrated = migrated_version or self._migrate_users(users)
+        migrated = self._migrate_users(users) or migrated_version
         global_data["owned_counts"] = self._recalculate_owned_counts(users)
         data["users"] = users
-        if migrated:
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+        if migrated or replayed:
+            data["journal_seq"] = self._journal_seq
+            self._write_snapshot(self._encode(data))
         return data
 
+    def _replay_journal(self, data: Dict) -> bool:
+        self._journal_seq = base_seq = data.get("journal_seq", 0)
+        try:
+            journal = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return False
+        replayed = False
+        with journal:
+            for line in journal:
+                try:
+                    record = _load_json(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append.
+                    print("⚠️  Ignoring incomplete record at the end of users.log")
+                    break
+                seq = record.get("seq", 0)
+                if seq <= base_seq:
+                    continue
+                data["users"].update(record.get("users", {}))
+                if "global" in record:
+                    data["global"] = record["global"]
+                self._journal_seq = seq
+                replayed = True
+        return replayed
+
     def _recalculate_owned_counts(self, users: Dict[str, Dict]) -> Dict[str, int]:
-        counts: Dict[str, int] = {}
+        # Runs after _migrate_users, so every bucket is a full dict of ints.
+        counts: Counter = Counter()
         for profile in users.values():
-            zoo = profile.get("zoo", {})
-            for animal_id, qty in zoo.items():
-                if isinstance(qty, dict):
-                    total = 0
-                    for v in qty.values():
-                        try:
-                            total += max(0, int(v))
-                        except (TypeError, ValueError):
-                            continue
-                else:
-                    total = max(0, int(qty))
-                counts[animal_id] = counts.get(animal_id, 0) + total
-        return counts
+            for animal_id, bucket in profile["zoo"].items():
+                counts[animal_id] += sum(bucket.values())
+        return dict(counts)
 
     def _migrate_users(self, users: Dict[str, Dict]) -> bool:
         migrated = False
@@ -571,72 +708,36 @@ class DataStore:
                 migrated = True
         return migrated
 
-    def _normalize_zoo_entry(self, value) -> Dict[str, int]:
-        if isinstance(value, dict):
-            bucket = default_mutation_counts()
-            for key, qty in value.items():
-                try:
-                    normalized = normalize_mutation_key(key)
-                    qty_int = int(qty)
-                except ValueError:
-                    continue
-                except TypeError:
-                    continue
-                bucket[normalized] = max(0, qty_int)
-            return bucket
-        try:
-            return {"none": max(0, int(value))}
-        except (ValueError, TypeError):
-            return default_mutation_counts()
-
     def _migrate_profile(self, user_id: str, profile: Dict) -> bool:
         migrated = False
         if "user_id" not in profile:
             profile["user_id"] = user_id
             migrated = True
-        if "coins" not in profile:
-            profile["coins"] = 0
-            migrated = True
-        if "energy" not in profile:
-            profile["energy"] = 0
-            migrated = True
-        if "zoo" not in profile:
-            profile["zoo"] = {}
-            migrated = True
-        if "team" not in profile:
-            profile["team"] = {"slot1": None, "slot2": None, "slot3": None}
-            migrated = True
-        if "foods" not in profile:
-            profile["foods"] = {}
-            migrated = True
-        if "equipped_foods" not in profile:
-            profile["equipped_foods"] = {"slot1": None, "slot2": None, "slot3": None}
-            migrated = True
-        if "equipped_food_wins" not in profile:
-            profile["equipped_food_wins"] = {"slot1": 0, "slot2": 0, "slot3": 0}
-            migrated = True
-        if "cooldowns" not in profile:
-            profile["cooldowns"] = {"hunt": 0.0, "battle": 0.0}
-            migrated = True
-        if "last_enemy_signature" not in profile:
-            profile["last_enemy_signature"] = None
-            migrated = True
-        if "battles_won" not in profile:
-            profile["battles_won"] = 0
+        missing = _PROFILE_DEFAULTS.keys() - profile.keys()
+        if missing:
             migrated = True
-
-        zoo = profile.get("zoo", {})
-        normalized_zoo: Dict[str, Dict[str, int]] = {}
-        for animal_id, value in zoo.items():
-            normalized_zoo[animal_id] = self._normalize_zoo_entry(value)
-            if value != normalized_zoo[animal_id]:
-                migrated = True
-        profile["zoo"] = normalized_zoo
+            for key, value in _PROFILE_DEFAULTS.items():
+                if key in missing:
+                    profile[key] = copy.deepcopy(value)
+
+        # The zoo only needs normalizing the first time this process sees the
+        # profile; from then on add_animal/remove_animal keep it in shape and
+        # maintain _totals.
+        if "_totals" not in profile:
+            normalized_zoo: Dict[str, Dict[str, int]] = {}
+            for animal_id, value in profile["zoo"].items():
+                animal_id = sys.intern(animal_id)
+                normalized_zoo[animal_id] = _normalize_bucket(value)
+                if value != normalized_zoo[animal_id]:
+                    migrated = True
+            profile["zoo"] = normalized_zoo
+            profile["_totals"] = _sum_buckets(normalized_zoo)
+            _bump_zoo_revision(profile)
+        normalized_zoo = profile["zoo"]
 
         team = profile.get("team", {})
         fixed_team: Dict[str, Optional[Dict[str, str]]] = {}
-        for i in range(1, 4):
-            slot = f"slot{i}"
+        for slot in SLOTS:
             raw_value = team.get(slot)
             if isinstance(raw_value, str):
                 slot_value = {"animal_id": raw_value, "mutation": "none"}
@@ -667,53 +768,74 @@ class DataStore:
                 migrated = True
             fixed_team[slot] = slot_value
         profile["team"] = fixed_team
+        if profile.get("battles_won") is None:
+            profile["battles_won"] = 0
+        profile["total_hunts"] = int(profile.get("total_hunts", 0))
+        # From here on level is only recomputed when a battle is won.
+        profile["level"] = compute_level(profile["battles_won"])
+        profile["_schema_ok"] = SCHEMA_VERSION
         return migrated
 
     def _default_profile(self, user_id: str) -> Dict:
-        team = {"slot1": None, "slot2": None, "slot3": None}
         return {
             "user_id": user_id,
-            "coins": 0,
-            "energy": 0,
-            "zoo": {},
-            "team": team,
-            "foods": {},
-            "equipped_foods": {"slot1": None, "slot2": None, "slot3": None},
-            "equipped_food_wins": {"slot1": 0, "slot2": 0, "slot3": 0},
-            "cooldowns": {"hunt": 0.0, "battle": 0.0},
-            "last_enemy_signature": None,
-            "battles_won": 0,
+            **copy.deepcopy(_PROFILE_DEFAULTS),
             "total_hunts": 0,
             "level": 1,
         }
 
     def load_profile(self, user_id: str) -> Dict:
+        # Callers mutate the returned profile in place, so its cached
+        # encoding can no longer be trusted.
+        self._stale_users.add(user_id)
+        self._journal_users.add(user_id)
         if user_id not in self.data.get("users", {}):
             self.data["users"][user_id] = self._default_profile(user_id)
             self._write_data()
         profile = self.data["users"][user_id]
-        if self._migrate_profile(user_id, profile):
+        if profile.get("_schema_ok") != SCHEMA_VERSION and self._migrate_profile(user_id, profile):
             self._write_data()
-        if profile.get("battles_won") is None:
-            profile["battles_won"] = 0
-        profile["total_hunts"] = int(profile.get("total_hunts", 0))
-        profile["level"] = compute_level(profile.get("battles_won", 0))
         return profile
 
+    def load_scalars(self, user_id: str, *keys: str) -> Dict[str, object]:
+        """Read top-level scalar fields without handing out the profile.
+
+        Nothing is created or marked for re-encoding, so read-only commands
+        cost no write. Unknown users read as the profile defaults.
+        """
+        profile = self.data["users"].get(user_id, _PROFILE_DEFAULTS)
+        return {key: profile.get(key, _PROFILE_DEFAULTS[key]) for key in keys}
+
     def save_profile(self, profile: Dict) -> None:
         self.data.setdefault("users", {})[profile["user_id"]] = profile
+        self.mark_dirty(profile["user_id"])
+
+    def mark_dirty(self, user_id: str) -> None:
+        # Only this user's encoding is redone; bursts of commands collapse into
+        # the single write scheduled by _write_data.
+        self._stale_users.add(user_id)
+        self._journal_users.add(user_id)
         self._write_data()
 
-    def record_hatch(self, animal_id: str) -> None:
+    def record_hatch(self, animal_id: str, count: int = 1) -> None:
         global_data = self.data.setdefault("global", {})
         hatch_counts = global_data.setdefault("hatch_counts", {})
-        hatch_counts[animal_id] = hatch_counts.get(animal_id, 0) + 1
+        hatch_counts[animal_id] = hatch_counts.get(animal_id, 0) + count
 
     def adjust_owned_count(self, animal_id: str, delta: int) -> None:
         global_data = self.data.setdefault("global", {})
         owned_counts = global_data.setdefault("owned_counts", {})
         owned_counts[animal_id] = max(0, owned_counts.get(animal_id, 0) + delta)
 
+    def global_stats_view(self) -> GlobalStatsView:
+        """Return the live (hatch, owned, sold) count dicts for bulk lookups."""
+        global_data = self.data.get("global", {})
+        return (
+            global_data.get("hatch_counts", {}),
+            global_data.get("owned_counts", {}),
+            global_data.get("sold_counts", {}),
+        )
+
     def record_sale(self, animal_id: str, amount: int) -> None:
         if amount <= 0:
             return
@@ -722,12 +844,149 @@ class DataStore:
         sold_counts[animal_id] = sold_counts.get(animal_id, 0) + amount
 
     def _write_data(self) -> None:
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2)
+        self._dirty = True
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (startup or offline scripts): write straight away.
+            self._write_sync()
+            return
+        self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(FLUSH_DELAY_SECONDS)
+            await self.flush()
+
+    async def flush(self, compact: bool = False) -> None:
+        """Persist pending changes; with *compact*, bring users.json fully up to date."""
+        await self._flush(compact)
+
+    async def export(self) -> bytes:
+        """Compact users.json and return its contents without reading it back."""
+        payload = await self._flush(compact=True)
+        if payload is None:
+            # Nothing was pending, so this matches the file; cached profile
+            # encodings make it cheap.
+            payload = self._encode(self.data)
+        return payload
+
+    async def _flush(self, compact: bool) -> Optional[bytes]:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            compact = (
+                compact
+                or self._force_compaction
+                or time.monotonic() - self._compacted_at >= COMPACT_INTERVAL_SECONDS
+            )
+            if not self._dirty and not (compact and self._journal_pending):
+                return None
+            self._dirty = False
+            # Serialize on the event loop so the snapshot is consistent; only the
+            # file IO is pushed to a worker thread.
+            if compact:
+                payload, write = self._encode_snapshot(), self._write_snapshot
+            else:
+                payload, write = self._encode_journal_record(), self._append_journal
+            try:
+                await asyncio.to_thread(write, payload)
+            except OSError as exc:
+                print(f"❌ Failed to write users.json: {exc}")
+                self._dirty = True
+                # The touched users were consumed by this attempt; only a
+                # full snapshot is sure to cover them now.
+                self._force_compaction = True
+                return None
+            if not compact:
+                self._journal_pending = True
+                return None
+            self._snapshot_written()
+            return payload
+
+    async def aclose(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self.flush(compact=True)
+
+    def flush_at_exit(self) -> None:
+        # Last resort for exits that skip aclose(); the event loop is gone by
+        # now, so write synchronously.
+        if self._dirty or self._journal_pending:
+            self._write_sync()
+
+    def _write_sync(self) -> None:
+        self._dirty = False
+        self._write_snapshot(self._encode_snapshot())
+        self._snapshot_written()
+
+    def _encode_snapshot(self) -> bytes:
+        self.data["journal_seq"] = self._journal_seq
+        self._journal_users.clear()
+        return self._encode(self.data)
+
+    def _snapshot_written(self) -> None:
+        self._journal_pending = False
+        self._force_compaction = False
+        self._compacted_at = time.monotonic()
+
+    def _encode_journal_record(self) -> bytes:
+        self._journal_seq += 1
+        users = self.data["users"]
+        record = {
+            "seq": self._journal_seq,
+            "users": {
+                user_id: _persistable_profile(users[user_id])
+                for user_id in self._journal_users
+                if user_id in users
+            },
+            "global": self.data["global"],
+        }
+        self._journal_users.clear()
+        return _dump_json_line(record)
+
+    def _append_journal(self, payload: bytes) -> None:
+        with open(self.journal_path, "ab") as f:
+            f.write(payload)
+
+    def _write_snapshot(self, payload: bytes) -> None:
+        # Only for payloads that already include every journal record. The
+        # document stores the last seq it covers, so a crash between the two
+        # steps just leaves records that replay skips.
+        self._write_bytes(payload)
+        with open(self.journal_path, "wb"):
+            pass
+
+    def _encode(self, data: Dict) -> bytes:
+        blobs = self._user_blobs
+        for user_id in self._stale_users:
+            blobs.pop(user_id, None)
+        self._stale_users.clear()
+        user_blobs: Dict[str, bytes] = {}
+        for user_id, profile in data["users"].items():
+            blob = blobs.get(user_id)
+            if blob is None:
+                blob = blobs[user_id] = _indent_json(_dump_json(_persistable_profile(profile)), 2)
+            user_blobs[user_id] = blob
+        return _assemble_document(data, user_blobs)
+
+    def _write_bytes(self, payload: bytes) -> None:
+        # Write beside the real file and swap it in, so a crash mid-write never
+        # leaves a truncated users.json behind.
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
 
 
 store = DataStore()
-DAILY_COOLDOWNS: Dict[str, float] = {}
+atexit.register(store.flush_at_exit)
+DAILY_COOLDOWN_SECONDS = 24 * 3600
 
 
 # ==============================
@@ -735,41 +994,37 @@ DAILY_COOLDOWNS: Dict[str, float] = {}
 # ==============================
 
 
+# Most queries are an exact emoji or alias, so try them as typed first.
 def resolve_animal(query: str) -> Optional[Animal]:
-    key = query.strip().lower()
-    animal_id = ALIASES.get(key)
-    if animal_id:
-        return ANIMALS[animal_id]
-    return None
+    return ALIAS_TO_ANIMAL.get(query) or ALIAS_TO_ANIMAL.get(query.strip().lower())
 
 
 def resolve_food(query: str) -> Optional[Food]:
-    key = query.strip().lower()
-    food_id = FOOD_ALIASES.get(key)
-    if food_id:
-        return FOODS[food_id]
-    return None
+    return ALIAS_TO_FOOD.get(query) or ALIAS_TO_FOOD.get(query.strip().lower())
+
+
+# A user mention (<@id> or legacy <@!id>) or a bare numeric id.
+_USER_ID_RE = re.compile(r"<@!?(\d+)>|(\d+)")
 
 
 def parse_user_id(target: str) -> Optional[str]:
-    cleaned = target.strip()
-    if cleaned.startswith("<@") and cleaned.endswith(">"):
-        cleaned = cleaned[2:-1]
-        if cleaned.startswith("!"):
-            cleaned = cleaned[1:]
-    if cleaned.isdigit():
-        return cleaned
-    return None
+    match = _USER_ID_RE.fullmatch(target.strip())
+    if match is None:
+        return None
+    return match.group(1) or match.group(2)
 
 
 def chunk_text_blocks(blocks: List[str], limit: int = 1024, separator: str = "\n\n") -> List[str]:
     chunks: List[str] = []
     current: List[str] = []
     current_length = 0
+    sep_length = len(separator)
     for block in blocks:
         block_length = len(block)
-        sep_length = len(separator) if current else 0
-        if current and current_length + sep_length + block_length > limit:
+        if not current:
+            current.append(block)
+            current_length = block_length
+        elif current_length + sep_length + block_length > limit:
             chunks.append(separator.join(current))
             current = [block]
             current_length = block_length
@@ -786,10 +1041,8 @@ def now() -> float:
 
 
 def format_cooldown(seconds_left: float) -> str:
-    seconds = int(max(0, seconds_left))
-    hours = seconds // 3600
-    minutes = (seconds % 3600) // 60
-    secs = seconds % 60
+    minutes, secs = divmod(int(max(0, seconds_left)), 60)
+    hours, minutes = divmod(minutes, 60)
     if hours:
         return f"{hours}h {minutes}m"
     if minutes:
@@ -797,60 +1050,81 @@ def format_cooldown(seconds_left: float) -> str:
     return f"{secs}s"
 
 
-def compute_level(battles_won: int) -> int:
-    wins = max(0, int(battles_won))
-    level = 1
-    threshold = 1
-    while wins >= threshold:
-        level += 1
-        threshold *= 2
-    return level
-
-
 def hp_bar(current: int, maximum: int) -> str:
-    filled = max(0, min(10, round(10 * current / maximum))) if maximum else 0
+    if maximum <= 0:
+        filled = 0
+    else:
+        # Integer round-half-to-even, the same rounding round() applies to
+        # 10 * current / maximum.
+        filled, remainder = divmod(10 * current, maximum)
+        if 2 * remainder > maximum or (2 * remainder == maximum and filled & 1):
+            filled += 1
+        filled = max(0, min(10, filled))
     return "█" * filled + "░" * (10 - filled)
 
 
 SUPERSCRIPT_MAP = {"0": "⁰", "1": "¹", "2": "²", "3": "³", "4": "⁴", "5": "⁵", "6": "⁶", "7": "⁷", "8": "⁸", "9": "⁹"}
 
 
+_SUPERSCRIPT_TABLE = str.maketrans(SUPERSCRIPT_MAP)
+
+
 def superscript_number(num: int) -> str:
     num_str = str(max(0, num))
     if len(num_str) == 1:
-        return SUPERSCRIPT_MAP["0"] + SUPERSCRIPT_MAP[num_str]
-    return "".join(SUPERSCRIPT_MAP[d] for d in num_str)
+        num_str = "0" + num_str
+    return num_str.translate(_SUPERSCRIPT_TABLE)
 
 
-def reserved_count(team: Dict[str, Optional[Dict[str, str]]], animal_id: str, mutation: str) -> int:
-    mutation = normalize_mutation_key(mutation)
-    total = 0
-    for slot in team.values():
-        if not slot or not isinstance(slot, dict):
-            continue
-        if slot.get("animal_id") == animal_id and slot.get("mutation") == mutation:
-            total += 1
-    return total
+Reservations = Dict[str, Counter]
 
 
-def reserved_species_count(team: Dict[str, Optional[Dict[str, str]]], animal_id: str) -> int:
-    return sum(
-        reserved_count(team, animal_id, mutation) for mutation in MUTATIONS
-    )
+def species_reservations(team: Dict[str, Optional[Dict[str, str]]]) -> Reservations:
+    """Map each animal on *team* to how many slots hold it, per mutation."""
+    reserved: Reservations = {}
+    for slot in team.values():
+        if slot and isinstance(slot, dict) and slot.get("mutation") in MUTATION_MULT:
+            reserved.setdefault(slot.get("animal_id"), Counter())[slot["mutation"]] += 1
+    return reserved
 
 
-def sellable_amount(profile: Dict, animal_id: str, mutation: str) -> int:
+# Handlers that check many animals or mutations pass one species_reservations()
+# result in, rather than walking the team for every lookup.
+def sellable_amount(
+    profile: Dict, animal_id: str, mutation: str, reservations: Optional[Reservations] = None
+) -> int:
+    mutation = normalize_mutation_key(mutation)
+    if reservations is None:
+        reservations = species_reservations(profile.get("team", {}))
     owned = get_owned_count(profile, animal_id, mutation)
-    reserved = reserved_count(profile.get("team", {}), animal_id, mutation)
+    reserved = reservations[animal_id][mutation] if animal_id in reservations else 0
     return max(0, owned - reserved)
 
 
-def sellable_species_amount(profile: Dict, animal_id: str) -> int:
+def sellable_species_amount(
+    profile: Dict, animal_id: str, reservations: Optional[Reservations] = None
+) -> int:
+    if reservations is None:
+        reservations = species_reservations(profile.get("team", {}))
     owned = total_owned_species(profile, animal_id)
-    reserved = reserved_species_count(profile.get("team", {}), animal_id)
+    reserved = sum(reservations[animal_id].values()) if animal_id in reservations else 0
     return max(0, owned - reserved)
 
 
+def sellable_species_map(profile: Dict, reservations: Optional[Reservations] = None) -> Dict[str, int]:
+    """sellable_species_amount for every species in the zoo that has any to sell."""
+    if reservations is None:
+        reservations = species_reservations(profile.get("team", {}))
+    sellable: Dict[str, int] = {}
+    for animal_id, bucket in profile["zoo"].items():
+        amount = sum(bucket.values())
+        if animal_id in reservations:
+            amount -= sum(reservations[animal_id].values())
+        if amount > 0:
+            sellable[animal_id] = amount
+    return sellable
+
+
 def roll_fusion_result(input_mutation: str) -> Tuple[str, int]:
     mutation = normalize_mutation_key(input_mutation)
     roll = random.random() * 100
@@ -890,7 +1164,7 @@ def add_food(profile: Dict, food_id: str, amount: int) -> None:
 
 
 def rarity_header(rarity: str) -> str:
-    symbol = dict(RARITY_ORDER)[rarity]
+    symbol = _RARITY_SYMBOL[rarity]
     return f"{symbol} {rarity}"
 
 
@@ -900,155 +1174,242 @@ def coins_reward(enemy_multiplier: float) -> int:
     return max(5, scaled)
 
 
+# Keyed by each slot's (rarity, normalized mutation, has food); a team only
+# has a few hundred possible shapes, and it rarely changes between battles.
+@lru_cache(maxsize=1024)
+def team_coin_factors(slots: Tuple[Tuple[str, str, bool], ...]) -> Tuple[float, float]:
+    """Return the win payout's team rarity multiplier and capped mutation/food factor."""
+    rarity_weights: List[float] = []
+    mutation_food_factors: List[float] = []
+    for rarity, mutation, has_food in slots:
+        rarity_weights.append(RARITY_COIN_WEIGHT.get(rarity, 1.0))
+        food_bonus_factor = 1.05 if has_food else 1.0
+        slot_factor = 1.0 + ((MUTATION_MULT[mutation] - 1.0) * 0.35) + ((food_bonus_factor - 1.0) * 0.5)
+        mutation_food_factors.append(slot_factor)
+
+    team_rarity_multiplier = sum(rarity_weights) / len(rarity_weights) if rarity_weights else 1.0
+    team_mutation_food_factor = (
+        sum(mutation_food_factors) / len(mutation_food_factors) if mutation_food_factors else 1.0
+    )
+    return team_rarity_multiplier, min(team_mutation_food_factor, 1.6)
+
+
 def enemy_signature(team: Dict[str, Animal], mutations: Optional[Dict[str, str]] = None) -> str:
-    parts: List[str] = []
-    for i in range(1, 4):
-        slot = f"slot{i}"
-        mut = ""
+    # "aid:mut|aid:mut|aid:mut", assembled in one join; ids and mutation keys
+    # are already interned at load.
+    pieces: List[str] = []
+    for slot in SLOTS:
+        pieces.append(team[slot].animal_id)
         if mutations:
             try:
                 mut_key = normalize_mutation_key(mutations.get(slot, "none"))
-                mut = f":{mut_key}"
             except ValueError:
-                mut = ""
-        parts.append(f"{team[slot].animal_id}{mut}")
-    return "|".join(parts)
+                pass
+            else:
+                pieces.append(":")
+                pieces.append(mut_key)
+        pieces.append("|")
+    pieces.pop()
+    return "".join(pieces)
 
 
 def team_def_alive(team_hp: Dict[str, int], team_animals: Dict[str, Animal]) -> int:
     total = 0
-    for i in range(1, 4):
-        slot = f"slot{i}"
+    for slot in SLOTS:
         if team_hp[slot] > 0:
             total += team_animals[slot].defense
     return total
 
 
 def pick_rarity() -> str:
-    roll = random.random() * 100
-    cumulative = 0.0
-    for chance, rarity in DROP_TABLE:
-        cumulative += chance
-        if roll <= cumulative:
-            return rarity
-    return DROP_TABLE[-1][1]
+    return _DROP_RARITIES[bisect_left(_DROP_THRESHOLDS, _rng.random() * 100)]
+
+
+# Pools keep ANIMALS order, so a random.choice over them picks the same
+# animal the old per-roll list comprehension did.
+ANIMALS_BY_RARITY: Dict[str, Tuple[Animal, ...]] = {
+    rarity: tuple(a for a in ANIMALS.values() if a.rarity == rarity)
+    for rarity, _symbol in RARITY_ORDER
+}
+# The same pools sorted by id, for listings.
+_RARITY_ANIMALS: Dict[str, Tuple[Animal, ...]] = {
+    rarity: tuple(sorted(pool, key=lambda a: a.animal_id))
+    for rarity, pool in ANIMALS_BY_RARITY.items()
+}
+ANIMALS_BY_ROLE_RARITY: Dict[Tuple[str, int], Tuple[Animal, ...]] = {
+    key: tuple(a for a in ANIMALS.values() if (a.role, a.rarity_index) == key)
+    for key in {(a.role, a.rarity_index) for a in ANIMALS.values()}
+}
+
+
+@lru_cache(maxsize=None)
+def _role_candidates(allowed_indices: Tuple[int, ...], role: str) -> Tuple[Animal, ...]:
+    # _ANIMAL_ROWS is grouped by ascending rarity, so walking the indices in
+    # order keeps ANIMALS order and each choice() draws as the full scan did.
+    allowed = set(allowed_indices)
+    return tuple(
+        a
+        for ridx in sorted(allowed)
+        for a in ANIMALS_BY_ROLE_RARITY.get((role, ridx), ())
+    )
 
 
 def random_animal_by_rarity_and_role(allowed_indices: List[int], role: str) -> Animal:
-    candidates = [a for a in ANIMALS.values() if a.role == role and a.rarity_index in allowed_indices]
-    return random.choice(candidates)
+    return _rng.choice(_role_candidates(tuple(allowed_indices), role))
 
 
 def power(animal: Animal) -> float:
-    return animal.hp * 1.0 + animal.atk * 1.5 + animal.defense * 1.2
+    return animal._power
 
 
 def food_power(food: Optional[Food]) -> float:
     if not food:
         return 0.0
-    return food.hp_bonus * 1.0 + food.atk_bonus * 1.5 + food.def_bonus * 1.2
+    return food._power
+
+
+MUTATION_MULT: Dict[str, float] = {
+    mutation: float(MUTATION_META.get(mutation, MUTATION_META["none"]).get("ability_multiplier", 1.0))
+    for mutation in MUTATIONS
+}
 
 
 def mutation_multiplier_value(mutation: str) -> float:
-    meta = MUTATION_META.get(normalize_mutation_key(mutation), MUTATION_META["none"])
-    return float(meta.get("ability_multiplier", 1.0))
+    return MUTATION_MULT[normalize_mutation_key(mutation)]
 
 
 def effective_power(animal: Animal, food: Optional[Food], mutation_multiplier: float) -> float:
     return (power(animal) + food_power(food)) * mutation_multiplier
 
 
+# Keyed by ids rather than the Animal/Food objects, whose dataclass hash walks
+# every field. The key space is species x foods x mutation spellings, and the
+# enemy search revisits the same triples hundreds of times per roll.
+@lru_cache(maxsize=4096)
+def _power_by_ids(animal_id: str, food_id: Optional[str], mutation_key: str) -> float:
+    food_bonus = FOODS[food_id]._power if food_id else 0.0
+    return (ANIMALS[animal_id]._power + food_bonus) * MUTATION_MULT[normalize_mutation_key(mutation_key)]
+
+
+def _slot_power(
+    animals: Dict[str, Animal],
+    foods: Dict[str, Optional[Food]],
+    mutations: Dict[str, str],
+    slot: str,
+) -> float:
+    food = foods.get(slot)
+    return _power_by_ids(animals[slot].animal_id, food.food_id if food else None, mutations.get(slot, "none"))
+
+
 def calculate_team_power(
     animals: Dict[str, Animal],
     foods: Dict[str, Optional[Food]],
     mutations: Dict[str, str],
 ) -> float:
+    # _slot_power() inlined; this runs hundreds of times per enemy roll.
     total = 0.0
-    for i in range(1, 4):
-        slot = f"slot{i}"
-        mutation_multiplier = mutation_multiplier_value(mutations.get(slot, "none"))
-        total += effective_power(animals[slot], foods.get(slot), mutation_multiplier)
+    for slot in SLOTS:
+        food = foods.get(slot)
+        total += _power_by_ids(animals[slot].animal_id, food.food_id if food else None, mutations.get(slot, "none"))
     return total
 
 
+# Enemy food candidates per rarity index: foods within one rarity step.
+_FOODS_NEAR: Dict[int, Tuple[Food, ...]] = {
+    idx: tuple(food for food in FOODS.values() if abs(RARITY_INDEX.get(food.rarity, 0) - idx) <= 1)
+    or tuple(FOODS.values())
+    for idx in set(RARITY_INDEX.values()) | {0}
+}
+
+
 def random_enemy_food(animal: Animal) -> Optional[Food]:
-    if random.random() >= 0.35:
+    if _rng.random() >= 0.35:
         return None
-    animal_idx = RARITY_INDEX.get(animal.rarity, 0)
-    candidates = [
-        food
-        for food in FOODS.values()
-        if abs(RARITY_INDEX.get(food.rarity, 0) - animal_idx) <= 1
-    ]
-    if not candidates:
-        candidates = list(FOODS.values())
-    return random.choice(candidates)
+    return _rng.choice(_FOODS_NEAR[RARITY_INDEX.get(animal.rarity, 0)])
 
 
-def random_enemy_mutation() -> str:
-    roll = random.random()
-    if roll < 0.55:
-        return "none"
-    if roll < 0.75:
-        return "golden"
-    if roll < 0.9:
-        return "diamond"
-    if roll < 0.97:
-        return "emerald"
-    return "rainbow"
+# Upper bound of each enemy mutation's slice of a [0, 1) roll; whatever is
+# left above the last bound rolls rainbow.
+ENEMY_MUTATION_BOUNDS: Tuple[Tuple[str, float], ...] = (
+    ("none", 0.55),
+    ("golden", 0.75),
+    ("diamond", 0.9),
+    ("emerald", 0.97),
+)
+_ENEMY_MUTATION_THRESHOLDS = tuple(bound for _mutation, bound in ENEMY_MUTATION_BOUNDS)
+_ENEMY_MUTATION_VALUES = tuple(mutation for mutation, _bound in ENEMY_MUTATION_BOUNDS) + ("rainbow",)
 
 
-MUTATION_STRENGTH_ORDER = sorted(MUTATIONS, key=lambda m: mutation_multiplier_value(m))
+def random_enemy_mutation() -> str:
+    return _ENEMY_MUTATION_VALUES[bisect_right(_ENEMY_MUTATION_THRESHOLDS, _rng.random())]
 
 
-def _downgrade_mutation(mutations: Dict[str, str]) -> bool:
-    sorted_slots = sorted(
-        ((slot, mutation_multiplier_value(mutation)) for slot, mutation in mutations.items()),
-        key=lambda item: item[1],
-        reverse=True,
-    )
-    for slot, current_multiplier in sorted_slots:
-        order_idx = MUTATION_STRENGTH_ORDER.index(normalize_mutation_key(mutations[slot]))
-        if order_idx > 0 and current_multiplier > 1.0:
-            mutations[slot] = MUTATION_STRENGTH_ORDER[order_idx - 1]
-            return True
-    return False
-
-
-def _upgrade_mutation(mutations: Dict[str, str]) -> bool:
-    sorted_slots = sorted(
-        ((slot, mutation_multiplier_value(mutation)) for slot, mutation in mutations.items()),
-        key=lambda item: item[1],
+MUTATION_STRENGTH_ORDER = sorted(MUTATIONS, key=lambda m: mutation_multiplier_value(m))
+MUTATION_INDEX: Dict[str, int] = {mutation: i for i, mutation in enumerate(MUTATION_STRENGTH_ORDER)}
+# How far each mutation widens the enemy power window in /battle.
+MUTATION_STAGE: Dict[str, int] = {"none": 0, "golden": 0, "diamond": 1, "emerald": 2, "rainbow": 3}
+
+
+def _downgrade_mutation(mutations: Dict[str, str]) -> Optional[str]:
+    # Step down the strongest mutated slot; ties go to the earliest slot.
+    target_slot = None
+    target_idx = 0
+    highest = 1.0
+    for slot, mutation in mutations.items():
+        mutation = normalize_mutation_key(mutation)
+        multiplier = MUTATION_MULT[mutation]
+        order_idx = MUTATION_INDEX[mutation]
+        if order_idx > 0 and multiplier > highest:
+            target_slot, target_idx, highest = slot, order_idx, multiplier
+    if target_slot is not None:
+        mutations[target_slot] = MUTATION_STRENGTH_ORDER[target_idx - 1]
+    return target_slot
+
+
+def _upgrade_mutation(mutations: Dict[str, str]) -> Optional[str]:
+    # Step up the weakest slot that can still improve; ties go to the earliest slot.
+    target_slot = None
+    target_idx = 0
+    lowest = 0.0
+    last_idx = len(MUTATION_STRENGTH_ORDER) - 1
+    for slot, mutation in mutations.items():
+        mutation = normalize_mutation_key(mutation)
+        multiplier = MUTATION_MULT[mutation]
+        order_idx = MUTATION_INDEX[mutation]
+        if order_idx < last_idx and (target_slot is None or multiplier < lowest):
+            target_slot, target_idx, lowest = slot, order_idx, multiplier
+    if target_slot is not None:
+        mutations[target_slot] = MUTATION_STRENGTH_ORDER[target_idx + 1]
+    return target_slot
+
+
+def _remove_highest_food(foods: Dict[str, Optional[Food]]) -> Optional[str]:
+    slot_to_remove = max(
+        (slot for slot, food in foods.items() if food is not None),
+        key=lambda slot: foods[slot]._power,
+        default=None,
     )
-    for slot, _mult in sorted_slots:
-        order_idx = MUTATION_STRENGTH_ORDER.index(normalize_mutation_key(mutations[slot]))
-        if order_idx < len(MUTATION_STRENGTH_ORDER) - 1:
-            mutations[slot] = MUTATION_STRENGTH_ORDER[order_idx + 1]
-            return True
-    return False
-
-
-def _remove_highest_food(foods: Dict[str, Optional[Food]]) -> bool:
-    slot_to_remove = None
-    highest = -1.0
-    for slot, food in foods.items():
-        fp = food_power(food)
-        if food and fp > highest:
-            highest = fp
-            slot_to_remove = slot
     if slot_to_remove:
         foods[slot_to_remove] = None
-        return True
-    return False
+    return slot_to_remove
 
 
-def _add_missing_food(animals: Dict[str, Animal], foods: Dict[str, Optional[Food]]) -> bool:
+def _add_missing_food(animals: Dict[str, Animal], foods: Dict[str, Optional[Food]]) -> Optional[str]:
     empty_slots = [slot for slot, food in foods.items() if food is None]
     if not empty_slots:
-        return False
-    slot = random.choice(empty_slots)
+        return None
+    slot = _rng.choice(empty_slots)
     foods[slot] = random_enemy_food(animals[slot])
-    return foods[slot] is not None
+    return slot if foods[slot] is not None else None
+
+
+def _sum_slot_powers(slot_powers: Dict[str, float]) -> float:
+    # Plain left-to-right addition, matching calculate_team_power (sum() on
+    # floats is compensated on newer Pythons and can round differently).
+    total = 0.0
+    for slot_power in slot_powers.values():
+        total += slot_power
+    return total
 
 
 def adjust_enemy_team(
@@ -1059,24 +1420,43 @@ def adjust_enemy_team(
     target_min: float,
     target_max: float,
 ) -> float:
+    # Each step changes at most one slot, so keep per-slot power and rescore
+    # only that slot. Summing in slot order gives the same float as
+    # calculate_team_power.
+    slot_powers = {slot: _slot_power(animals, foods, mutations, slot) for slot in SLOTS}
+
+    # Closed-form shortcut: without food, a uniform mutation tier scales the
+    # bare team's power by that tier's multiplier. If one tier lands in range,
+    # use it before falling back to the random walk.
+    if not target_min <= _sum_slot_powers(slot_powers) <= target_max:
+        bare_power = 0.0
+        for slot in SLOTS:
+            bare_power += animals[slot]._power
+        for mutation in MUTATION_STRENGTH_ORDER:
+            if target_min <= bare_power * MUTATION_MULT[mutation] <= target_max:
+                for slot in SLOTS:
+                    foods[slot] = None
+                    mutations[slot] = mutation
+                    slot_powers[slot] = _slot_power(animals, foods, mutations, slot)
+                break
+
+    slot_list = tuple(animals)
     for _ in range(350):
-        current_power = calculate_team_power(animals, foods, mutations)
+        current_power = _sum_slot_powers(slot_powers)
         if target_min <= current_power <= target_max:
             return current_power
         if current_power > target_max:
-            if _remove_highest_food(foods):
-                continue
-            if _downgrade_mutation(mutations):
-                continue
+            changed = _remove_highest_food(foods) or _downgrade_mutation(mutations)
         else:
-            if _add_missing_food(animals, foods):
-                continue
-            if _upgrade_mutation(mutations):
-                continue
-        slot = random.choice(list(animals.keys()))
+            changed = _add_missing_food(animals, foods) or _upgrade_mutation(mutations)
+        if changed:
+            slot_powers[changed] = _slot_power(animals, foods, mutations, changed)
+            continue
+        slot = _rng.choice(slot_list)
         animals[slot] = random_animal_by_rarity_and_role(allowed_indices, animals[slot].role)
         foods[slot] = None if current_power > target_max else random_enemy_food(animals[slot])
         mutations[slot] = "none" if current_power > target_max else random_enemy_mutation()
+        slot_powers[slot] = _slot_power(animals, foods, mutations, slot)
 
     # Final enforcement to guarantee constraints
     strongest_food = max(FOODS.values(), key=food_power)
@@ -1084,29 +1464,26 @@ def adjust_enemy_team(
     strongest_index = max(allowed_indices)
 
     for _ in range(200):
-        current_power = calculate_team_power(animals, foods, mutations)
+        current_power = _sum_slot_powers(slot_powers)
         if target_min <= current_power <= target_max:
             break
         if current_power > target_max:
-            if _remove_highest_food(foods):
-                continue
-            if _downgrade_mutation(mutations):
-                continue
-            slot = random.choice(list(animals.keys()))
-            animals[slot] = random_animal_by_rarity_and_role([weakest_index], animals[slot].role)
-            foods[slot] = None
-            mutations[slot] = "none"
+            changed = _remove_highest_food(foods) or _downgrade_mutation(mutations)
+            if not changed:
+                changed = _rng.choice(slot_list)
+                animals[changed] = random_animal_by_rarity_and_role([weakest_index], animals[changed].role)
+                foods[changed] = None
+                mutations[changed] = "none"
         else:
-            if _add_missing_food(animals, foods):
-                continue
-            if _upgrade_mutation(mutations):
-                continue
-            slot = random.choice(list(animals.keys()))
-            animals[slot] = random_animal_by_rarity_and_role([strongest_index], animals[slot].role)
-            foods[slot] = strongest_food
-            mutations[slot] = MUTATION_STRENGTH_ORDER[-1]
+            changed = _add_missing_food(animals, foods) or _upgrade_mutation(mutations)
+            if not changed:
+                changed = _rng.choice(slot_list)
+                animals[changed] = random_animal_by_rarity_and_role([strongest_index], animals[changed].role)
+                foods[changed] = strongest_food
+                mutations[changed] = MUTATION_STRENGTH_ORDER[-1]
+        slot_powers[changed] = _slot_power(animals, foods, mutations, changed)
 
-    return calculate_team_power(animals, foods, mutations)
+    return _sum_slot_powers(slot_powers)
 
 
 def apply_food(animal: Animal, food: Optional[Food]) -> Tuple[int, int, int]:
@@ -1116,6 +1493,84 @@ def apply_food(animal: Animal, food: Optional[Food]) -> Tuple[int, int, int]:
     return hp, atk, defense
 
 
+BATTLE_ROUND_CAP = 100
+
+
+def _alive_mask(hp: List[int]) -> int:
+    mask = 0
+    for idx, value in enumerate(hp):
+        if value > 0:
+            mask |= 1 << idx
+    return mask
+
+
+def _alive_defense(stats: List[Tuple[int, int, int]], hp: List[int]) -> int:
+    return sum(slot_stats[2] for slot_stats, value in zip(stats, hp) if value > 0)
+
+
+def _attack_phase(
+    attacker_stats: List[Tuple[int, int, int]],
+    attacker_alive: int,
+    defender_hp: List[int],
+    defender_stats: List[Tuple[int, int, int]],
+    defender_alive: int,
+    defender_def: int,
+) -> Tuple[int, int]:
+    """Let every living attacker hit the first living defender, in slot order.
+
+    Bit i of an alive mask is set while slot i has HP left, so the lowest set
+    bit is the front-most fighter. Returns the defender's updated mask and the
+    DEF total of its living slots, which only changes when one falls.
+    """
+    while attacker_alive and defender_alive:
+        attacker_bit = attacker_alive & -attacker_alive
+        attacker_alive ^= attacker_bit
+        target_bit = defender_alive & -defender_alive
+        target = target_bit.bit_length() - 1
+        dmg = max(1, attacker_stats[attacker_bit.bit_length() - 1][1] - defender_def)
+        remaining = defender_hp[target] - dmg
+        if remaining > 0:
+            defender_hp[target] = remaining
+        else:
+            defender_hp[target] = 0
+            defender_alive ^= target_bit
+            defender_def -= defender_stats[target][2]
+    return defender_alive, defender_def
+
+
+def simulate_battle(
+    player_stats: List[Tuple[int, int, int]],
+    enemy_stats: List[Tuple[int, int, int]],
+) -> Tuple[List[int], List[int], bool]:
+    """Fight two teams of (hp, atk, defense) in slot order.
+
+    Returns the remaining HP of each side and whether the player won.
+    """
+    player_hp = [stats[0] for stats in player_stats]
+    enemy_hp = [stats[0] for stats in enemy_stats]
+    player_alive = _alive_mask(player_hp)
+    enemy_alive = _alive_mask(enemy_hp)
+    player_def = _alive_defense(player_stats, player_hp)
+    enemy_def = _alive_defense(enemy_stats, enemy_hp)
+    rounds = 0
+    while player_alive and enemy_alive and rounds < BATTLE_ROUND_CAP:
+        rounds += 1
+        enemy_alive, enemy_def = _attack_phase(
+            player_stats, player_alive, enemy_hp, enemy_stats, enemy_alive, enemy_def
+        )
+        if not enemy_alive:
+            break
+        player_alive, player_def = _attack_phase(
+            enemy_stats, enemy_alive, player_hp, player_stats, player_alive, player_def
+        )
+
+    if rounds >= BATTLE_ROUND_CAP and player_alive and enemy_alive:
+        player_win = sum(player_hp) > sum(enemy_hp)
+    else:
+        player_win = bool(player_alive) and not enemy_alive
+    return player_hp, enemy_hp, player_win
+
+
 class MyClient(discord.Client):
     def __init__(self):
         intents = discord.Intents.default()
@@ -1131,7 +1586,7 @@ class MyClient(discord.Client):
 client = MyClient()
 
 
-def build_help_embed(page: int) -> Optional[discord.Embed]:
+def _render_help_embed(page: int) -> Optional[discord.Embed]:
     header_text = "Use slash commands (/) to interact with the bot."
 
     if page == 1:
@@ -1246,6 +1701,14 @@ def build_help_embed(page: int) -> Optional[discord.Embed]:
     return None
 
 
+# The help pages are static; build them once and hand out the same embeds.
+_HELP_EMBEDS: Dict[int, discord.Embed] = {page: _render_help_embed(page) for page in (1, 2)}
+
+
+def build_help_embed(page: int) -> Optional[discord.Embed]:
+    return _HELP_EMBEDS.get(page)
+
+
 @client.tree.command(name="help", description="📘 View the Emoji Zoo help pages")
 @app_commands.describe(page="Help page number (1 or 2)")
 async def help_command(interaction: discord.Interaction, page: int = 1):
@@ -1268,13 +1731,17 @@ def build_index_embed() -> discord.Embed:
     return embed
 
 
-def format_animal_block(animal: Animal, mutation_counts: Dict[str, int]) -> str:
-    owned_amount = sum(max(0, int(qty)) for qty in mutation_counts.values())
+def format_animal_block(
+    animal: Animal,
+    mutation_counts: Mapping[str, int],
+    stats: Optional[Tuple[int, int, int]] = None,
+) -> str:
+    owned_amount = sum(mutation_counts.values())
     owned_indicator = "🟢" if owned_amount > 0 else "🔴"
     spawn_chance = spawn_chance_for_animal(animal)
-    hatched, owned_global, sold_global = global_animal_stats(animal.animal_id)
+    hatched, owned_global, sold_global = stats or global_animal_stats(animal.animal_id)
     owned_summary = format_owned_summary(
-        pluralize(animal.animal_id).replace("_", " "), animal.emoji, mutation_counts
+        ANIMAL_DISPLAY_NAMES[animal.animal_id], animal.emoji, mutation_counts
     )
     return (
         f"{owned_indicator} {animal.emoji} {animal.animal_id}\n"
@@ -1299,6 +1766,8 @@ class IndexView(discord.ui.View):
         self.profile = profile
         self.rarity_position = 0
         self.filter_mode = "all"
+        # animal_id -> ((zoo revision, global stats), rendered block)
+        self._block_cache: Dict[str, Tuple[Tuple[Optional[int], Tuple[int, int, int]], str]] = {}
         self._sync_button_states()
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
@@ -1321,50 +1790,45 @@ class IndexView(discord.ui.View):
         )
 
     def _build_page(self) -> discord.Embed:
-        self.profile = store.load_profile(str(self.user_id))
         rarity, emoji = RARITY_ORDER[self.rarity_position]
         animals = rarity_animals(rarity)
+        stats_view = store.global_stats_view()
         blocks: List[str] = []
         for animal in animals:
             mutation_counts = mutation_bucket(self.profile, animal.animal_id)
-            owned_amount = sum(max(0, int(qty)) for qty in mutation_counts.values())
+            owned_amount = sum(mutation_counts.values())
             if self.filter_mode == "owned" and owned_amount <= 0:
                 continue
             if self.filter_mode == "not_owned" and owned_amount > 0:
                 continue
-            blocks.append(format_animal_block(animal, mutation_counts))
+            blocks.append(self._animal_block(animal, mutation_counts, stats_view))
 
         embed = build_index_embed()
         filter_titles = {"all": "All", "owned": "Owned", "not_owned": "Not Owned"}
         embed.title = f"📘 Animal Index — {emoji} {rarity.title()}"
         display_blocks = blocks or ["No animals match this filter."]
-        chunk: List[str] = []
-        chunk_length = 0
-        for block in display_blocks:
-            block_length = len(block)
-            separator_length = 2 if chunk else 0
-            if chunk and chunk_length + separator_length + block_length > 1024:
-                embed.add_field(
-                    name=f"Filter: {filter_titles[self.filter_mode]}" if not embed.fields else "Continued",
-                    value="\n\n".join(chunk),
-                    inline=False,
-                )
-                chunk = [block]
-                chunk_length = block_length
-            else:
-                if chunk:
-                    chunk_length += separator_length
-                chunk.append(block)
-                chunk_length += block_length
-
-        if chunk:
+        for chunk in chunk_text_blocks(display_blocks):
             embed.add_field(
                 name=f"Filter: {filter_titles[self.filter_mode]}" if not embed.fields else "Continued",
-                value="\n\n".join(chunk),
+                value=chunk,
                 inline=False,
             )
         return embed
 
+    def _animal_block(
+        self, animal: Animal, mutation_counts: Mapping[str, int], stats_view: GlobalStatsView
+    ) -> str:
+        # A block only changes with this user's zoo (tracked by its revision)
+        # or the animal's global counters; filter and page flips reuse it.
+        stats = global_animal_stats(animal.animal_id, stats_view)
+        key = (self.profile.get("_rev"), stats)
+        cached = self._block_cache.get(animal.animal_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        block = format_animal_block(animal, mutation_counts, stats)
+        self._block_cache[animal.animal_id] = (key, block)
+        return block
+
     async def _update_message(self, interaction: discord.Interaction) -> None:
         self._sync_button_states()
         await interaction.response.edit_message(embed=self._build_page(), view=self)
@@ -1600,27 +2064,22 @@ async def index(interaction: discord.Interaction):
     await interaction.response.send_message(embed=view._build_page(), view=view)
 
 
-def rarity_drop_rate_map() -> Dict[str, float]:
-    return {rarity: chance for chance, rarity in DROP_TABLE}
-
-
-def rarity_animals(rarity: str) -> List[Animal]:
-    return sorted([a for a in ANIMALS.values() if a.rarity == rarity], key=lambda a: a.animal_id)
+def rarity_animals(rarity: str) -> Tuple[Animal, ...]:
+    return _RARITY_ANIMALS.get(rarity, ())
 
 
 def spawn_chance_for_animal(animal: Animal) -> float:
-    rarity_chance = rarity_drop_rate_map().get(animal.rarity, 0.0)
+    rarity_chance = _RARITY_DROP_RATE.get(animal.rarity, 0.0)
     animals_in_rarity = len(rarity_animals(animal.rarity))
     if animals_in_rarity == 0:
         return 0.0
     return rarity_chance / animals_in_rarity
 
 
-def global_animal_stats(animal_id: str) -> Tuple[int, int, int]:
-    global_data = store.data.get("global", {})
-    hatch_counts = global_data.get("hatch_counts", {})
-    owned_counts = global_data.get("owned_counts", {})
-    sold_counts = global_data.get("sold_counts", {})
+def global_animal_stats(
+    animal_id: str, stats_view: Optional[GlobalStatsView] = None
+) -> Tuple[int, int, int]:
+    hatch_counts, owned_counts, sold_counts = stats_view or store.global_stats_view()
     return (
         hatch_counts.get(animal_id, 0),
         owned_counts.get(animal_id, 0),
@@ -1638,47 +2097,51 @@ async def on_message(message: discord.Message):
         return
 
     if lowered.startswith("-data"):
-        store._write_data()
+        payload = await store.export()
         await message.channel.send(
             "📂 Current users.json backup. Replace your local file with this copy.",
-            file=discord.File(DATA_FILE_PATH, filename="users.json"),
+            file=discord.File(io.BytesIO(payload), filename="users.json"),
         )
 
 
 @client.tree.command(name="balance", description="💼 Check your coins and energy")
 async def balance(interaction: discord.Interaction):
-    profile = store.load_profile(str(interaction.user.id))
+    balance = store.load_scalars(str(interaction.user.id), "coins", "energy")
     embed = discord.Embed(title="💼 Your Balance", color=0xF1C40F)
-    embed.add_field(name=f"{COINS_EMOJI} Coins", value=str(profile["coins"]), inline=False)
-    embed.add_field(name=f"{ENERGY_EMOJI} Energy", value=str(profile["energy"]), inline=False)
+    embed.add_field(name=f"{COINS_EMOJI} Coins", value=str(balance["coins"]), inline=False)
+    embed.add_field(name=f"{ENERGY_EMOJI} Energy", value=str(balance["energy"]), inline=False)
     await interaction.response.send_message(embed=embed)
 
 
+_PROFILE_MUTATION_PREFIXES: Tuple[Tuple[str, str], ...] = (
+    ("none", "None"),
+    *(
+        (mutation, f"{mutation.title()} {MUTATION_META[mutation]['emoji']} x{multiplier}")
+        for mutation, multiplier in (
+            ("golden", "1.25"),
+            ("diamond", "1.5"),
+            ("emerald", "2"),
+            ("rainbow", "5"),
+        )
+    ),
+)
+
+
 @client.tree.command(name="profile", description="🧾 View your player profile")
 async def profile_command(interaction: discord.Interaction):
     profile = store.load_profile(str(interaction.user.id))
     battles_won = max(0, int(profile.get("battles_won", 0)))
-    level = compute_level(battles_won)
-    profile["level"] = level
+    level = profile["level"]
     next_threshold = 2 ** (level - 1)
     remaining = max(0, next_threshold - battles_won)
 
-    mutation_totals = aggregate_mutation_totals(profile)
+    # Read-only here, so use the running totals without copying them.
+    mutation_totals = _zoo_totals(profile)
     total_owned = sum(mutation_totals.values())
 
-    mutation_lines = [f"None: {mutation_totals['none']}"]
-    mutation_lines.append(
-        f"Golden {MUTATION_META['golden']['emoji']} x1.25: {mutation_totals['golden']}"
-    )
-    mutation_lines.append(
-        f"Diamond {MUTATION_META['diamond']['emoji']} x1.5: {mutation_totals['diamond']}"
-    )
-    mutation_lines.append(
-        f"Emerald {MUTATION_META['emerald']['emoji']} x2: {mutation_totals['emerald']}"
-    )
-    mutation_lines.append(
-        f"Rainbow {MUTATION_META['rainbow']['emoji']} x5: {mutation_totals['rainbow']}"
-    )
+    mutation_lines = [
+        f"{prefix}: {mutation_totals[mutation]}" for mutation, prefix in _PROFILE_MUTATION_PREFIXES
+    ]
 
     embed = discord.Embed(title="🧾 Profile", color=0x9B59B6)
     embed.add_field(name="Level", value=str(level), inline=True)
@@ -1707,9 +2170,11 @@ async def profile_command(interaction: discord.Interaction):
 @client.tree.command(name="daily", description="🎁 Claim your daily coins reward")
 async def daily(interaction: discord.Interaction):
     user_id = str(interaction.user.id)
-    profile = store.load_profile(user_id)
     now_ts = now()
-    cooldown_until = DAILY_COOLDOWNS.get(user_id, 0.0)
+    # Kept on the profile so claims survive a restart; profiles saved before
+    # that have no "daily" entry yet.
+    cooldowns = store.load_scalars(user_id, "cooldowns")["cooldowns"]
+    cooldown_until = cooldowns.get("daily", 0.0)
     if cooldown_until > now_ts:
         wait = format_cooldown(cooldown_until - now_ts)
         embed = discord.Embed(
@@ -1722,10 +2187,11 @@ async def daily(interaction: discord.Interaction):
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
+    profile = store.load_profile(user_id)
     profile["coins"] += 100
     profile["energy"] += 40
+    profile["cooldowns"]["daily"] = now_ts + DAILY_COOLDOWN_SECONDS
     store.save_profile(profile)
-    DAILY_COOLDOWNS[user_id] = now_ts + 24 * 3600
     embed = discord.Embed(title="🎁 Daily Reward", color=0x2ECC71)
     embed.add_field(name=f"{COINS_EMOJI} Coins", value="+100", inline=False)
     embed.add_field(name=f"{ENERGY_EMOJI} Energy", value="+40", inline=False)
@@ -1733,66 +2199,48 @@ async def daily(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed)
 
 
+_ZOO_RARITY_HEADERS: Dict[str, str] = {
+    rarity: f"{symbol} {rarity.title()}" for rarity, symbol in RARITY_ORDER
+}
+_ZOO_MUTATION_SUFFIX: Dict[str, str] = {
+    mutation: ""
+    if mutation == "none"
+    else f" ({MUTATION_META[mutation]['emoji']} {_format_multiplier(MUTATION_META[mutation]['multiplier'])}x)"
+    for mutation in MUTATION_ORDER
+}
+
+
 @client.tree.command(name="zoo", description="🗂️ View your zoo inventory counts")
 async def zoo(interaction: discord.Interaction):
     profile = store.load_profile(str(interaction.user.id))
+    zoo_buckets = profile["zoo"]
     sections: List[str] = []
 
-    for rarity, symbol in RARITY_ORDER:
-        animals = sorted(
-            [a for a in ANIMALS.values() if a.rarity == rarity], key=lambda a: a.animal_id
-        )
-        entries: List[str] = []
-        for animal in animals:
-            bucket = mutation_bucket(profile, animal.animal_id)
-            total_owned = sum(max(0, int(qty)) for qty in bucket.values())
-            if total_owned <= 0:
-                continue
-
-            for mutation in MUTATION_ORDER:
-                qty = int(bucket.get(mutation, 0))
-                if qty <= 0:
-                    continue
-                entry = f"{animal.emoji} {superscript_number(qty)}"
-                if mutation != "none":
-                    mutation_meta = MUTATION_META[mutation]
-                    multiplier_text = _format_multiplier(mutation_meta["multiplier"])
-                    entry = f"{entry} ({mutation_meta['emoji']} {multiplier_text}x)"
-                entries.append(entry)
-
-        if not entries:
-            continue
-
-        section_lines = [f"{symbol} {rarity.title()}", " ".join(entries)]
-        sections.append("\n".join(section_lines))
+    for rarity, header in _ZOO_RARITY_HEADERS.items():
+        # load_profile has already normalized every bucket.
+        entries = [
+            f"{animal.emoji} {superscript_number(bucket[mutation])}{_ZOO_MUTATION_SUFFIX[mutation]}"
+            for animal in rarity_animals(rarity)
+            if (bucket := zoo_buckets.get(animal.animal_id)) is not None
+            for mutation in MUTATION_ORDER
+            if bucket[mutation] > 0
+        ]
+        if entries:
+            sections.append(f"{header}\n{' '.join(entries)}")
 
     if not sections:
         await interaction.response.send_message("Your zoo is empty.")
         return
 
-    heading = f"🌿 🌱 🌳 **{interaction.user.display_name}'s zoo!** 🌳 🌿 🌱\n\n"
-    content = heading + "\n\n".join(sections)
-
-    messages: List[str] = []
-    current_block = ""
-    for block in content.split("\n\n"):
-        separator = "\n\n" if current_block else ""
-        candidate = f"{current_block}{separator}{block}" if current_block else block
-        if len(candidate) > 1900:
-            messages.append(current_block)
-            current_block = block
-        else:
-            current_block = candidate
-    if current_block:
-        messages.append(current_block)
+    heading = f"🌿 🌱 🌳 **{interaction.user.display_name}'s zoo!** 🌳 🌿 🌱"
+    messages = chunk_text_blocks([heading, *sections], limit=1900)
 
     await interaction.response.send_message(messages[0])
     for chunk in messages[1:]:
         await interaction.followup.send(chunk)
 
 
-@client.tree.command(name="shop", description="🛒 Browse the food store")
-async def shop(interaction: discord.Interaction):
+def _render_shop_embed() -> discord.Embed:
     embed = discord.Embed(
         title="🛒 Food Shop",
         description="All foods are always in stock. Pick a snack and equip it with /use.",
@@ -1813,7 +2261,16 @@ async def shop(interaction: discord.Interaction):
             )
         embed.add_field(name=f"{symbol} {rarity.title()}", value="\n".join(value_lines), inline=False)
     embed.set_footer(text="Use /use <food> <slot> to equip")
-    await interaction.response.send_message(embed=embed)
+    return embed
+
+
+# FOODS never changes at runtime, so neither does the shop.
+_SHOP_EMBED = _render_shop_embed()
+
+
+@client.tree.command(name="shop", description="🛒 Browse the food store")
+async def shop(interaction: discord.Interaction):
+    await interaction.response.send_message(embed=_SHOP_EMBED)
 
 
 @client.tree.command(name="buy", description="🧺 Buy a food by emoji or alias")
@@ -1856,12 +2313,13 @@ async def inv(interaction: discord.Interaction):
     if not profile["foods"]:
         embed.description = "You don't own any food. Visit /shop to buy some."
     else:
+        by_rarity: Dict[str, List[str]] = {rarity: [] for rarity, _symbol in RARITY_ORDER}
+        for food_id, qty in profile["foods"].items():
+            food = FOODS.get(food_id)
+            if food and qty > 0 and food.rarity in by_rarity:
+                by_rarity[food.rarity].append(f"{food.emoji} {food.food_id.replace('_', ' ')} x{qty}")
         for rarity, symbol in RARITY_ORDER:
-            entries = []
-            for food_id, qty in profile["foods"].items():
-                food = FOODS.get(food_id)
-                if food and food.rarity == rarity and qty > 0:
-                    entries.append(f"{food.emoji} {food.food_id.replace('_', ' ')} x{qty}")
+            entries = by_rarity[rarity]
             if entries:
                 embed.add_field(name=f"{symbol} {rarity.title()}", value="\n".join(entries), inline=False)
     embed.set_footer(text="Equip foods onto your team with /use")
@@ -1917,13 +2375,13 @@ async def stats(interaction: discord.Interaction, animal: str):
             "❌ Unknown animal\nTry an emoji or alias.", ephemeral=True
         )
         return
-    rarity_symbol = dict(RARITY_ORDER)[a.rarity]
+    rarity_symbol = _RARITY_SYMBOL[a.rarity]
     hatched, owned_global, sold_global = global_animal_stats(a.animal_id)
     spawn_chance = spawn_chance_for_animal(a)
     profile = store.load_profile(str(interaction.user.id))
     mutation_counts = mutation_bucket(profile, a.animal_id)
     owned_summary = format_owned_summary(
-        pluralize(a.animal_id).replace("_", " "), a.emoji, mutation_counts
+        ANIMAL_DISPLAY_NAMES[a.animal_id], a.emoji, mutation_counts
     )
     msg = (
         f"{rarity_symbol} {a.emoji} {a.animal_id}\n"
@@ -1954,15 +2412,10 @@ class TeamCommands(app_commands.Group):
             description="Your active battle team.\nSlot order matters.",
             color=0x9B59B6,
         )
-        slot_info = {
-            1: ("slot1", "🛡️ Tank"),
-            2: ("slot2", "⚔️ Attack"),
-            3: ("slot3", "🧪 Support"),
-        }
         total_hp = 0
         total_atk = 0
         total_def = 0
-        for idx, (slot_key, label) in slot_info.items():
+        for idx, slot_key, label in _TEAM_SLOTS:
             slot_value = profile["team"].get(slot_key)
             animal_id = slot_value.get("animal_id") if isinstance(slot_value, dict) else None
             if animal_id:
@@ -2040,7 +2493,8 @@ class TeamCommands(app_commands.Group):
             return
 
         profile = store.load_profile(str(interaction.user.id))
-        available_total = sellable_species_amount(profile, a.animal_id)
+        reservations = species_reservations(profile["team"])
+        available_total = sellable_species_amount(profile, a.animal_id, reservations)
         if available_total <= 0:
             await interaction.response.send_message(
                 "❌ You don't own that animal yet.", ephemeral=True
@@ -2048,7 +2502,7 @@ class TeamCommands(app_commands.Group):
             return
         chosen_mutation = None
         for mutation in MUTATIONS:
-            if sellable_amount(profile, a.animal_id, mutation) > 0:
+            if sellable_amount(profile, a.animal_id, mutation, reservations) > 0:
                 chosen_mutation = mutation
                 break
         if not chosen_mutation:
@@ -2083,14 +2537,13 @@ client.tree.add_command(AdminCommands())
 client.tree.add_command(TeamCommands())
 
 
+_NEW_TAG = " 🆕"
+
+
 @client.tree.command(name="hunt", description="🌱 Spend coins and energy to roll animals")
 async def hunt(interaction: discord.Interaction):
     profile = store.load_profile(str(interaction.user.id))
-    profile.setdefault("battles_won", 0)
-    profile.setdefault("total_hunts", 0)
-
-    level = compute_level(profile["battles_won"])
-    profile["level"] = level
+    level = profile["level"]
 
     now_ts = now()
     if profile["cooldowns"]["hunt"] > now_ts:
@@ -2123,29 +2576,28 @@ async def hunt(interaction: discord.Interaction):
 
     profile["total_hunts"] += 1
 
-    results: List[Tuple[Animal, str]] = []
     before_counts = {
         animal_id: total_owned_species(profile, animal_id) for animal_id in profile.get("zoo", {})
     }
+    rolled: Counter = Counter()
     for _ in range(rolls):
-        rarity = pick_rarity()
-        pool = [a for a in ANIMALS.values() if a.rarity == rarity]
-        animal = random.choice(pool)
-        mutation = roll_mutation()
-        add_animal(profile, animal.animal_id, mutation, 1)
-        store.record_hatch(animal.animal_id)
-        store.adjust_owned_count(animal.animal_id, 1)
-        results.append((animal, mutation))
-
-    profile["cooldowns"]["hunt"] = now_ts + 10
-    store.save_profile(profile)
+        animal = random.choice(ANIMALS_BY_RARITY[pick_rarity()])
+        rolled[animal.animal_id, roll_mutation()] += 1
 
     grouped: Dict[str, Dict[str, Dict[str, int]]] = {
         rarity: {} for rarity, _ in RARITY_ORDER
     }
-    for animal, rolled_mutation in results:
-        animal_bucket = grouped[animal.rarity].setdefault(animal.animal_id, {})
-        animal_bucket[rolled_mutation] = animal_bucket.get(rolled_mutation, 0) + 1
+    hatched: Counter = Counter()
+    for (animal_id, mutation), count in rolled.items():
+        add_animal(profile, animal_id, mutation, count)
+        hatched[animal_id] += count
+        grouped[ANIMALS[animal_id].rarity].setdefault(animal_id, {})[mutation] = count
+    for animal_id, count in hatched.items():
+        store.record_hatch(animal_id, count)
+        store.adjust_owned_count(animal_id, count)
+
+    profile["cooldowns"]["hunt"] = now_ts + 10
+    store.save_profile(profile)
 
     lines = ["🌱 Hunt Results", "────────────────"]
 
@@ -2153,25 +2605,23 @@ async def hunt(interaction: discord.Interaction):
         animals_by_mutation = grouped[rarity]
         if not animals_by_mutation:
             continue
-        entries = []
-        for animal_id in sorted(animals_by_mutation.keys()):
-            animal = ANIMALS[animal_id]
-            is_new = before_counts.get(animal_id, 0) == 0
-            new_tag = " 🆕" if is_new else ""
-            for mutation in MUTATION_ORDER:
-                count = animals_by_mutation[animal_id].get(mutation, 0)
-                if count <= 0:
-                    continue
-                variant = format_variant_count(animal.emoji, mutation, count)
-                entries.append(f"{variant}{new_tag}")
-        lines.append("")
-        lines.append(f"{symbol} {rarity.capitalize()}")
-        lines.append("  ".join(entries))
-
-    lines.append("")
-    lines.append("────────────────")
-    lines.append(f"{COINS_EMOJI} Coins spent: {coins_spent}")
-    lines.append(f"{ENERGY_EMOJI} Energy used: {rolls}")
+        entries = "  ".join(
+            format_variant_count(ANIMALS[animal_id].emoji, mutation, counts[mutation])
+            + (_NEW_TAG if before_counts.get(animal_id, 0) == 0 else "")
+            for animal_id, counts in sorted(animals_by_mutation.items())
+            for mutation in MUTATION_ORDER
+            if counts.get(mutation, 0) > 0
+        )
+        lines.extend(("", f"{symbol} {rarity.capitalize()}", entries))
+
+    lines.extend(
+        (
+            "",
+            "────────────────",
+            f"{COINS_EMOJI} Coins spent: {coins_spent}",
+            f"{ENERGY_EMOJI} Energy used: {rolls}",
+        )
+    )
 
     await interaction.response.send_message("\n".join(lines))
 
@@ -2229,14 +2679,18 @@ async def sell(
     sell_all = amount_lower == "all"
     sell_count = None
     if not sell_all:
-        if not amount_lower.isdigit() or int(amount_lower) <= 0:
+        # isdecimal() keeps int()'s extras ("+5", "1_000") out, and unlike
+        # isdigit() it also refuses superscripts, which int() cannot parse.
+        sell_count = int(amount_lower) if amount_lower.isdecimal() else 0
+        if sell_count <= 0:
             await interaction.response.send_message(
                 "❌ Invalid amount\nUse a positive number or 'all'.", ephemeral=True
             )
             return
-        sell_count = int(amount_lower)
 
     profile = store.load_profile(str(interaction.user.id))
+    # The team is not touched while a sale is planned.
+    reservations = species_reservations(profile.get("team", {}))
 
     def finalize_sale(changes: List[Tuple[Animal, str, int]]) -> Tuple[int, int]:
         total_coins = 0.0
@@ -2263,7 +2717,7 @@ async def sell(
         remaining = qty
         allocations: List[Tuple[str, int]] = []
         for mutation in MUTATIONS:
-            available = sellable_amount(profile, animal_obj.animal_id, mutation)
+            available = sellable_amount(profile, animal_obj.animal_id, mutation, reservations)
             if available <= 0:
                 continue
             portion = min(available, remaining)
@@ -2281,8 +2735,7 @@ async def sell(
         if not food_obj:
             await interaction.response.send_message("❌ Unknown food. Try an emoji or alias.", ephemeral=True)
             return
-        equipped_foods = set(profile.get("equipped_foods", {}).values())
-        if food_obj.food_id in equipped_foods:
+        if food_obj.food_id in profile.get("equipped_foods", {}).values():
             await interaction.response.send_message(
                 "❌ Cannot sell equipped food. Replace it first.", ephemeral=True
             )
@@ -2341,7 +2794,7 @@ async def sell(
                 )
                 return
             sell_amount = owned_specific if sell_all else sell_count or 0
-            available_amount = sellable_amount(profile, a.animal_id, mutation_key)
+            available_amount = sellable_amount(profile, a.animal_id, mutation_key, reservations)
             if sell_amount > available_amount:
                 await interaction.response.send_message(
                     f"❌ Cannot sell\nYou can sell up to {available_amount} of that mutation (team animals are excluded).",
@@ -2351,7 +2804,7 @@ async def sell(
             plan = [(a, mutation_key, sell_amount)]
         else:
             sell_amount = owned_species if sell_all else sell_count or 0
-            available_amount = sellable_species_amount(profile, a.animal_id)
+            available_amount = sellable_species_amount(profile, a.animal_id, reservations)
             if sell_amount > available_amount:
                 await interaction.response.send_message(
                     f"❌ Cannot sell\nYou can sell up to {available_amount} of that animal (team animals are excluded).",
@@ -2371,17 +2824,18 @@ async def sell(
                 ephemeral=True,
             )
             return
-        plan: List[Tuple[Animal, str, int]] = []
-        for animal_obj in ANIMALS.values():
-            if animal_obj.rarity != rarity_key:
-                continue
-            available_total = sellable_species_amount(profile, animal_obj.animal_id)
-            if available_total <= 0:
-                continue
-            qty = available_total if sell_all else min(available_total, sell_count or 0)
-            if qty > 0:
-                for mutation, portion in allocate_sale(animal_obj, qty):
-                    plan.append((animal_obj, mutation, portion))
+        # sellable only holds positive totals and sell_count is positive, so
+        # every listed species contributes at least one allocation.
+        sellable = sellable_species_map(profile, reservations)
+        plan: List[Tuple[Animal, str, int]] = [
+            (animal_obj, mutation, portion)
+            for animal_obj in ANIMALS_BY_RARITY.get(rarity_key, ())
+            if animal_obj.animal_id in sellable
+            for mutation, portion in allocate_sale(
+                animal_obj,
+                sellable[animal_obj.animal_id] if sell_all else min(sellable[animal_obj.animal_id], sell_count),
+            )
+        ]
         if not plan:
             await interaction.response.send_message(
                 "❌ Cannot sell\nNo animals of that rarity are available (team animals are excluded).",
@@ -2513,37 +2967,46 @@ async def battle(interaction: discord.Interaction):
     await interaction.response.defer()
     try:
         profile = store.load_profile(str(interaction.user.id))
+        team = profile["team"]
+        equipped = profile.get("equipped_foods", {})
+        cooldowns = profile["cooldowns"]
         now_ts = now()
-        if profile["cooldowns"]["battle"] > now_ts:
-            wait = format_cooldown(profile["cooldowns"]["battle"] - now_ts)
+        if cooldowns["battle"] > now_ts:
+            wait = format_cooldown(cooldowns["battle"] - now_ts)
             await interaction.edit_original_response(content=f"⏳ Cooldown\nTry again in {wait}.")
             return
-        if not all(profile["team"].get(f"slot{i}") for i in range(1, 4)):
+        if not all(team.get(slot) for slot in SLOTS):
             await interaction.edit_original_response(
                 content="❌ Team incomplete\nSet slot 1 (TANK), slot 2 (ATTACK), slot 3 (SUPPORT)."
             )
             return
 
+        # Animal, mutation, food, battle stats and power for each slot, in one pass.
         player_animals: Dict[str, Animal] = {}
         player_mutations: Dict[str, str] = {}
-        for i in range(1, 4):
-            slot = f"slot{i}"
-            slot_value = profile["team"].get(slot)
+        player_foods: Dict[str, Optional[Food]] = {}
+        # Stats and HP are positional (index i is SLOTS[i]), as simulate_battle takes them.
+        player_stats: List[Tuple[int, int, int]] = []
+        player_final_power = 0.0
+        for slot in SLOTS:
+            slot_value = team.get(slot)
             if not isinstance(slot_value, dict) or not slot_value.get("animal_id"):
                 await interaction.edit_original_response(
                     content="❌ Team incomplete\nSet slot 1 (TANK), slot 2 (ATTACK), slot 3 (SUPPORT)."
                 )
                 return
-            player_animals[slot] = ANIMALS[slot_value["animal_id"]]
+            animal = ANIMALS[slot_value["animal_id"]]
             try:
-                player_mutations[slot] = normalize_mutation_key(slot_value.get("mutation", "none"))
+                mutation = normalize_mutation_key(slot_value.get("mutation", "none"))
             except ValueError:
-                player_mutations[slot] = "none"
-        player_foods: Dict[str, Optional[Food]] = {}
-        for i in range(1, 4):
-            slot = f"slot{i}"
-            food_id = profile.get("equipped_foods", {}).get(slot)
-            player_foods[slot] = FOODS.get(food_id) if food_id else None
+                mutation = "none"
+            food_id = equipped.get(slot)
+            food = FOODS.get(food_id) if food_id else None
+            player_animals[slot] = animal
+            player_mutations[slot] = mutation
+            player_foods[slot] = food
+            player_stats.append(apply_food(animal, food))
+            player_final_power += effective_power(animal, food, MUTATION_MULT[mutation])
 
         avg_index = round(
             sum(a.rarity_index for a in player_animals.values()) / 3
@@ -2554,31 +3017,9 @@ async def battle(interaction: discord.Interaction):
                 allowed.add(idx)
         allowed_indices = sorted(allowed)
 
-        player_final_power = 0.0
-        for slot, animal in player_animals.items():
-            mutation_multiplier = mutation_multiplier_value(player_mutations.get(slot, "none"))
-            player_final_power += effective_power(animal, player_foods.get(slot), mutation_multiplier)
-
-        def mutation_stage(mutation_key: str) -> int:
-            try:
-                normalized = normalize_mutation_key(mutation_key)
-            except ValueError:
-                normalized = "none"
-            return {"none": 0, "golden": 0, "diamond": 1, "emerald": 2, "rainbow": 3}.get(
-                normalized, 0
-            )
-
         food_count = sum(1 for food in player_foods.values() if food)
-        mutated_count = 0
-        highest_stage = 0
-        for mut in player_mutations.values():
-            try:
-                normalized = normalize_mutation_key(mut)
-            except ValueError:
-                normalized = "none"
-            if normalized != "none":
-                mutated_count += 1
-            highest_stage = max(highest_stage, mutation_stage(normalized))
+        mutated_count = sum(1 for mut in player_mutations.values() if mut != "none")
+        highest_stage = max(MUTATION_STAGE[mut] for mut in player_mutations.values())
 
         def base_range() -> Tuple[float, float]:
             if mutated_count == 0:
@@ -2604,37 +3045,39 @@ async def battle(interaction: discord.Interaction):
         target_max = player_final_power * (max_pct / 100.0)
         last_signature = profile.get("last_enemy_signature")
 
-        best_candidate: Optional[Tuple[Dict[str, Animal], Dict[str, Optional[Food]], Dict[str, str], float, str]] = None
+        best_candidate: Optional[Tuple[Dict[str, Animal], Dict[str, Optional[Food]], Dict[str, str], float]] = None
         best_delta = float("inf")
-        best_in_range: Optional[Tuple[Dict[str, Animal], Dict[str, Optional[Food]], Dict[str, str], float, str]] = None
+        best_in_range: Optional[Tuple[Dict[str, Animal], Dict[str, Optional[Food]], Dict[str, str], float]] = None
         best_in_range_not_same: Optional[
-            Tuple[Dict[str, Animal], Dict[str, Optional[Food]], Dict[str, str], float, str]
+            Tuple[Dict[str, Animal], Dict[str, Optional[Food]], Dict[str, str], float]
         ] = None
 
+        # Same draws as random_animal_by_rarity_and_role, with the pools looked
+        # up once rather than three times per attempt.
+        allowed_key = tuple(allowed_indices)
+        role_pools = tuple(
+            (slot, _role_candidates(allowed_key, role))
+            for slot, role in zip(SLOTS, ("TANK", "ATTACK", "SUPPORT"))
+        )
         for _attempt in range(300):
-            enemy_animals = {
-                "slot1": random_animal_by_rarity_and_role(allowed_indices, "TANK"),
-                "slot2": random_animal_by_rarity_and_role(allowed_indices, "ATTACK"),
-                "slot3": random_animal_by_rarity_and_role(allowed_indices, "SUPPORT"),
-            }
+            enemy_animals = {slot: _rng.choice(pool) for slot, pool in role_pools}
             enemy_foods = {slot: random_enemy_food(animal) for slot, animal in enemy_animals.items()}
             enemy_mutations = {slot: random_enemy_mutation() for slot in enemy_animals}
             enemy_power = calculate_team_power(enemy_animals, enemy_foods, enemy_mutations)
-            signature = enemy_signature(enemy_animals, enemy_mutations)
-
-            candidate = (enemy_animals, enemy_foods, enemy_mutations, enemy_power, signature)
-            delta = 0.0
-            if enemy_power < target_min:
-                delta = target_min - enemy_power
-            elif enemy_power > target_max:
-                delta = enemy_power - target_max
 
+            candidate = (enemy_animals, enemy_foods, enemy_mutations, enemy_power)
             if target_min <= enemy_power <= target_max:
-                if signature != last_signature:
+                # Only in-range teams are compared against the last opponent.
+                if enemy_signature(enemy_animals, enemy_mutations) != last_signature:
                     best_in_range_not_same = candidate
                     break
                 if not best_in_range:
                     best_in_range = candidate
+                delta = 0.0
+            elif enemy_power < target_min:
+                delta = target_min - enemy_power
+            else:
+                delta = enemy_power - target_max
             if delta < best_delta:
                 best_delta = delta
                 best_candidate = candidate
@@ -2645,7 +3088,7 @@ async def battle(interaction: discord.Interaction):
                 content="❌ Battle setup failed. Please try again."
             )
             return
-        chosen_animals, chosen_foods, chosen_mutations, _, _ = final_choice
+        chosen_animals, chosen_foods, chosen_mutations, _ = final_choice
         enemy_final_power = adjust_enemy_team(
             chosen_animals,
             chosen_foods,
@@ -2660,7 +3103,9 @@ async def battle(interaction: discord.Interaction):
         enemy_foods = chosen_foods
         enemy_mutations = chosen_mutations
 
-        enemy_final_power = calculate_team_power(enemy_animals, enemy_foods, enemy_mutations)
+        # adjust_enemy_team returns exactly calculate_team_power of the team it
+        # leaves behind, so there is nothing to recompute; it only gets a second
+        # pass when the first could not reach the window.
         if enemy_final_power < target_min or enemy_final_power > target_max:
             enemy_final_power = adjust_enemy_team(
                 enemy_animals,
@@ -2670,100 +3115,35 @@ async def battle(interaction: discord.Interaction):
                 target_min,
                 target_max,
             )
-        enemy_final_power = calculate_team_power(enemy_animals, enemy_foods, enemy_mutations)
-
-        player_hp = {}
-        enemy_hp = {}
-        player_stats: Dict[str, Tuple[int, int, int]] = {}
-        enemy_stats: Dict[str, Tuple[int, int, int]] = {}
-        for slot, animal in player_animals.items():
-            hp, atk, defense = apply_food(animal, player_foods.get(slot))
-            player_stats[slot] = (hp, atk, defense)
-            player_hp[slot] = hp
-        for slot, animal in enemy_animals.items():
-            hp, atk, defense = apply_food(animal, enemy_foods.get(slot))
-            enemy_stats[slot] = (hp, atk, defense)
-            enemy_hp[slot] = hp
-
-        def first_alive(hp_map: Dict[str, int]) -> Optional[str]:
-            for i in range(1, 4):
-                slot = f"slot{i}"
-                if hp_map[slot] > 0:
-                    return slot
-            return None
-
-        def attack_phase(attacker_hp: Dict[str, int], attacker_stats: Dict[str, Tuple[int, int, int]], defender_hp: Dict[str, int], defender_stats: Dict[str, Tuple[int, int, int]]):
-            for i in range(1, 4):
-                slot = f"slot{i}"
-                if attacker_hp.get(slot, 0) <= 0:
-                    continue
-                target_slot = first_alive(defender_hp)
-                if not target_slot:
-                    break
-                def_value = sum(defender_stats[s][2] for s, hp in defender_hp.items() if hp > 0)
-                dmg = max(1, attacker_stats[slot][1] - def_value)
-                defender_hp[target_slot] = max(0, defender_hp[target_slot] - dmg)
-
-        rounds = 0
-        while first_alive(player_hp) and first_alive(enemy_hp) and rounds < 100:
-            rounds += 1
-            attack_phase(player_hp, player_stats, enemy_hp, enemy_stats)
-            if not first_alive(enemy_hp):
-                break
-            attack_phase(enemy_hp, enemy_stats, player_hp, player_stats)
-
-        player_alive = first_alive(player_hp) is not None
-        enemy_alive = first_alive(enemy_hp) is not None
-        cap_reached = rounds >= 100 and player_alive and enemy_alive
-        if cap_reached:
-            player_hp_total = sum(max(0, hp) for hp in player_hp.values())
-            enemy_hp_total = sum(max(0, hp) for hp in enemy_hp.values())
-            player_win = player_hp_total > enemy_hp_total
-        else:
-            player_win = player_alive and not enemy_alive
 
-        enemy_final_power = calculate_team_power(enemy_animals, enemy_foods, enemy_mutations)
+        enemy_stats = [apply_food(enemy_animals[slot], enemy_foods.get(slot)) for slot in SLOTS]
+        player_hp, enemy_hp, player_win = simulate_battle(player_stats, enemy_stats)
+
         enemy_multiplier = enemy_final_power / player_final_power if player_final_power > 0 else 1.0
         energy_gain = 1 if player_win else 0
         base_coins = coins_reward(enemy_multiplier)
         coin_gain = 0
         if player_win:
-            rarity_weights: List[float] = []
-            mutation_food_factors: List[float] = []
-            for i in range(1, 4):
-                slot = f"slot{i}"
-                animal = player_animals.get(slot)
-                if not animal:
-                    continue
-                rarity_weights.append(RARITY_COIN_WEIGHT.get(animal.rarity, 1.0))
-                mutation_mult = mutation_multiplier_value(player_mutations.get(slot, "none"))
-                food_bonus_factor = 1.05 if player_foods.get(slot) else 1.0
-                slot_factor = 1.0 + ((mutation_mult - 1.0) * 0.35) + (
-                    (food_bonus_factor - 1.0) * 0.5
+            team_rarity_multiplier, team_mutation_food_factor = team_coin_factors(
+                tuple(
+                    (animal.rarity, player_mutations[slot], player_foods.get(slot) is not None)
+                    for slot, animal in player_animals.items()
                 )
-                mutation_food_factors.append(slot_factor)
-
-            team_rarity_multiplier = (
-                sum(rarity_weights) / len(rarity_weights) if rarity_weights else 1.0
             )
-            team_mutation_food_factor = (
-                sum(mutation_food_factors) / len(mutation_food_factors)
-                if mutation_food_factors
-                else 1.0
-            )
-            team_mutation_food_factor = min(team_mutation_food_factor, 1.6)
             coin_gain = max(
                 5, round(base_coins * team_rarity_multiplier * team_mutation_food_factor)
             )
 
         profile["energy"] += energy_gain
         profile["coins"] += coin_gain
-        profile["cooldowns"]["battle"] = now_ts + 10
+        cooldowns["battle"] = now_ts + 10
         if player_win:
             profile["battles_won"] = profile.get("battles_won", 0) + 1
-            for slot, food_id in profile.get("equipped_foods", {}).items():
+            profile["level"] = compute_level(profile["battles_won"])
+            food_wins = profile["equipped_food_wins"]
+            for slot, food_id in equipped.items():
                 if food_id:
-                    profile["equipped_food_wins"][slot] = profile["equipped_food_wins"].get(slot, 0) + 1
+                    food_wins[slot] = food_wins.get(slot, 0) + 1
         store.save_profile(profile)
         embed_color = 0x2ECC71 if player_win else 0xE74C3C
         banner = (
@@ -2772,50 +3152,19 @@ async def battle(interaction: discord.Interaction):
             else f"{LOSE_EMOJI} YOU LOST! {LOSE_EMOJI}"
         )
 
-        def format_line(
-            role_emoji: str,
-            animal_obj: Animal,
-            mutation_key: str,
-            food_obj: Optional[Food],
-            current_hp: int,
-            max_hp: int,
-        ) -> str:
-            mutation_emoji = MUTATION_META.get(mutation_key, MUTATION_META["none"]).get("emoji", "")
-            pieces = [role_emoji, animal_obj.emoji, animal_obj.animal_id]
-            if mutation_emoji:
-                pieces.append(mutation_emoji)
-            if food_obj:
-                pieces.append(food_obj.emoji)
-            header = " ".join(pieces)
-            return f"{header}\nHP: {current_hp}/{max_hp}"
-
-        enemy_lines = []
-        for i in range(1, 4):
-            slot = f"slot{i}"
-            enemy_lines.append(
-                format_line(
-                    ROLE_EMOJI[enemy_animals[slot].role],
-                    enemy_animals[slot],
-                    enemy_mutations.get(slot, "none"),
-                    enemy_foods.get(slot),
-                    enemy_hp[slot],
-                    enemy_stats[slot][0],
-                )
-            )
-
-        player_lines = []
-        for i in range(1, 4):
-            slot = f"slot{i}"
-            player_lines.append(
-                format_line(
-                    ROLE_EMOJI[player_animals[slot].role],
-                    player_animals[slot],
-                    player_mutations.get(slot, "none"),
-                    player_foods.get(slot),
-                    player_hp[slot],
-                    player_stats[slot][0],
-                )
-            )
+        def team_field(animals, mutations, foods, hp, stats) -> str:
+            blocks = []
+            for idx, slot in enumerate(SLOTS):
+                animal_obj = animals[slot]
+                pieces = [ROLE_EMOJI[animal_obj.role], animal_obj.emoji, animal_obj.animal_id]
+                mutation_emoji = MUTATION_EMOJI.get(mutations.get(slot, "none"), "")
+                if mutation_emoji:
+                    pieces.append(mutation_emoji)
+                food_obj = foods.get(slot)
+                if food_obj:
+                    pieces.append(food_obj.emoji)
+                blocks.append(f"{' '.join(pieces)}\nHP: {hp[idx]}/{stats[idx][0]}")
+            return "\n\n".join(blocks)
 
         rewards_lines = [f"{COINS_EMOJI} Coins: +{coin_gain}", f"{ENERGY_EMOJI} Energy: +{energy_gain}"]
         if player_win:
@@ -2824,8 +3173,16 @@ async def battle(interaction: discord.Interaction):
             )
 
         embed = discord.Embed(title=banner, color=embed_color)
-        embed.add_field(name="Your Team", value="\n\n".join(player_lines), inline=True)
-        embed.add_field(name="Enemy Team", value="\n\n".join(enemy_lines), inline=True)
+        embed.add_field(
+            name="Your Team",
+            value=team_field(player_animals, player_mutations, player_foods, player_hp, player_stats),
+            inline=True,
+        )
+        embed.add_field(
+            name="Enemy Team",
+            value=team_field(enemy_animals, enemy_mutations, enemy_foods, enemy_hp, enemy_stats),
+            inline=True,
+        )
         embed.add_field(name="Rewards", value="\n".join(rewards_lines), inline=False)
 
         await interaction.edit_original_response(content=None, embed=embed)
@@ -2851,6 +3208,10 @@ async def on_ready():
     print("===========================")
 
 
+@client.event
+async def on_disconnect():
+    await store.flush()
+
 
 async def run_bot_with_backoff():
     """Run the Discord bot, backing off when login is rate limited."""
@@ -2858,21 +3219,25 @@ async def run_bot_with_backoff():
     backoff_seconds = 60
     max_backoff_seconds = 600
 
-    while True:
-        try:
-            await client.start(TOKEN)
-            break
-        except discord.HTTPException as exc:
-            if exc.status == 429:
-                retry_after = getattr(exc, "retry_after", None) or backoff_seconds
-                print(
-                    "⚠️  Login hit global rate limit. "
-                    f"Waiting {retry_after} seconds before retrying."
-                )
-                backoff_seconds = min(backoff_seconds * 2, max_backoff_seconds)
-                await asyncio.sleep(retry_after)
-                continue
-            raise
+    try:
+        while True:
+            try:
+                await client.start(TOKEN)
+                break
+            except discord.HTTPException as exc:
+                if exc.status == 429:
+                    retry_after = getattr(exc, "retry_after", None) or backoff_seconds
+                    print(
+                        "⚠️  Login hit global rate limit. "
+                        f"Waiting {retry_after} seconds before retrying."
+                    )
+                    backoff_seconds = min(backoff_seconds * 2, max_backoff_seconds)
+                    await asyncio.sleep(retry_after)
+                    continue
+                raise
+    finally:
+        # Persist any writes still waiting on the debounce timer.
+        await store.aclose()
 
 
 if __name__ == "__main__":